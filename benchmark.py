@@ -0,0 +1,201 @@
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from playwright.async_api import async_playwright
+from mock_server import MockConfig, start_mock_server
+from scripts import SCRIPTS, load_script
+from worker_pool import RetryPolicy
+
+# Runs the scraping paths against the local mock server and reports throughput,
+# per-phase latency percentiles and memory, without touching the live site
+
+def fetch_outcome(lines):
+    # fetch_technology_stack returns marker lines instead of a status
+    if lines == ["No suggestions available"]:
+        return "no_suggestions"
+    if lines == ["No technology stack found"]:
+        return "no_data"
+    if lines == ["Error occurred"]:
+        return "error"
+    return "success"
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def process_tree_rss():
+    # Resident memory of this process and all descendants (Chromium included), in bytes.
+    # Falls back to our own peak RSS where /proc is not available.
+    try:
+        parents = {}
+        rss = {}
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat", "r") as file:
+                    fields = file.read().rsplit(")", 1)[1].split()
+                with open(f"/proc/{entry}/statm", "r") as file:
+                    rss[int(entry)] = int(file.read().split()[1]) * page_size
+                parents[int(entry)] = int(fields[1])
+            except (OSError, IndexError, ValueError):
+                continue
+        total = 0
+        stack = [os.getpid()]
+        while stack:
+            pid = stack.pop()
+            total += rss.get(pid, 0)
+            stack.extend(child for child, parent in parents.items() if parent == pid)
+        return total
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+async def sample_memory(peak, interval=0.5):
+    while True:
+        peak[0] = max(peak[0], process_tree_rss())
+        await asyncio.sleep(interval)
+
+
+class MemorySink:
+    def __init__(self):
+        self.results = []
+
+    def write(self, result):
+        self.results.append(result)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+async def run(args):
+    config = MockConfig(
+        latency_ms=args.latency_ms,
+        render_ms=args.render_ms,
+        failure_rate=args.failure_rate,
+        no_suggestion_rate=args.no_suggestion_rate,
+    )
+    server, base_url = start_mock_server(config=config)
+    module = load_script(args.script)
+    module.HOME_URL = base_url
+    module.LOOKUP_URL = base_url + "lookup/{domain}/"
+    module.LOOKUP_MODE = args.mode
+    module.CONCURRENCY = args.concurrency
+    module.REQUESTS_PER_SECOND = args.rps
+    module.RETRY = RetryPolicy(base_delay=args.retry_delay, max_delay=args.retry_delay * 8)
+    os.chdir(tempfile.mkdtemp(prefix="benchmark-"))  # Side files such as domains_without_suggestions.txt
+
+    phases = defaultdict(list)
+    analyze_website = module.analyze_website
+
+    async def timed_analyze_website(page, website, waits=module.WAITS):
+        start = time.perf_counter()
+        try:
+            return await analyze_website(page, website, waits)
+        finally:
+            phases["analyze_website"].append(time.perf_counter() - start)
+
+    module.analyze_website = timed_analyze_website
+    domains = [f"site{i}.example" for i in range(args.domains)]
+    sink = MemorySink()
+    peak_rss = [process_tree_rss()]
+    sampler = asyncio.create_task(sample_memory(peak_rss))
+
+    try:
+        async with async_playwright() as p:
+            browser = await module.PROFILE.launch(p)
+            context = await browser.new_context()
+            page = await context.new_page()
+            await module.PROFILE.attach(page)
+
+            start = time.perf_counter()
+            await module.login(page, "benchmark@example.com", "benchmark")
+            phases["login"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await module.analyze_websites(context, domains, sink)
+            elapsed = time.perf_counter() - start
+
+            fetch_outcomes = Counter()
+            for domain in domains[:args.fetch_sample]:
+                await page.goto(module.HOME_URL)
+                await module.WAITS.wait_for_search_box(page, '#input-80')
+                start = time.perf_counter()
+                lines = await module.fetch_technology_stack(page, domain)
+                phases["fetch_technology_stack"].append(time.perf_counter() - start)
+                fetch_outcomes[fetch_outcome(lines)] += 1
+
+            start = time.perf_counter()
+            await module.logout(page)
+            phases["logout"].append(time.perf_counter() - start)
+
+            await context.close()
+            await browser.close()
+    finally:
+        sampler.cancel()
+        module.PARSER.close()
+        server.shutdown()
+
+    return {
+        "script": args.script,
+        "mode": args.mode,
+        "concurrency": args.concurrency,
+        "domains": len(domains),
+        "results": len(sink.results),
+        "elapsed_seconds": round(elapsed, 3),
+        "domains_per_minute": round(len(sink.results) / elapsed * 60, 1) if elapsed else None,
+        "outcomes": dict(Counter(result.get("status", "unknown") for result in sink.results)),
+        "fetch_outcomes": dict(fetch_outcomes),  # Read the fetch_technology_stack latencies against these
+        "phases": {
+            name: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+            }
+            for name, values in phases.items()
+        },
+        "peak_rss_mb": round(peak_rss[0] / 1024 / 1024, 1),
+        "metrics": module.METRICS.summary(),  # Finer phases recorded inside the scripts
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scraping paths against the local mock server")
+    parser.add_argument("--script", choices=sorted(SCRIPTS), default="outdated_components")
+    parser.add_argument("--mode", choices=["direct", "typed"], default="direct", help="LOOKUP_MODE to run with")
+    parser.add_argument("--domains", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rps", type=float, default=0, help="global requests-per-second ceiling, 0 for none")
+    parser.add_argument("--fetch-sample", type=int, default=5, help="domains to run through fetch_technology_stack")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--render-ms", type=float, default=50)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--no-suggestion-rate", type=float, default=0.1)
+    parser.add_argument("--retry-delay", type=float, default=0.5, help="base backoff for retried failures, in seconds")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+    output = os.path.abspath(args.output) if args.output else None  # run() changes directory
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=4))
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=4)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
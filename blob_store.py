@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import io
+import os
+import sys
+import tempfile
+from result_sink import ResultSink, iter_results
+from stack_parser import parse_technology_chunks, technology_lines
+
+try:
+    import zstandard
+except ImportError:  # gzip is used instead
+    zstandard = None
+
+BLOB_DIR = "blobs"
+CHUNK_SIZE = 64 * 1024
+
+
+class BlobStore:
+    # Content-addressed store for captured HTML: blobs/<ab>/<sha256>.zst, or .gz when
+    # zstandard is not installed. The key is the hash of the uncompressed text, so an
+    # identical capture is stored once whichever codec wrote it.
+    def __init__(self, root=BLOB_DIR, codec=None, level=None):
+        self.root = root
+        self.codec = codec or ("zst" if zstandard else "gz")
+        if self.codec == "zst" and zstandard is None:
+            raise RuntimeError("zstd blobs need the zstandard package: pip install zstandard")
+        self.level = level
+        self.written = 0
+        self.deduplicated = 0
+
+    def path(self, digest, codec):
+        return os.path.join(self.root, digest[:2], f"{digest}.{codec}")
+
+    def find(self, digest):
+        for codec in ("zst", "gz"):
+            path = self.path(digest, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None, None
+
+    def compress(self, data):
+        if self.codec == "zst":
+            return zstandard.ZstdCompressor(level=self.level or 10).compress(data)
+        return gzip.compress(data, compresslevel=self.level or 6, mtime=0)
+
+    def put(self, text):
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        if self.find(digest)[0]:
+            self.deduplicated += 1
+            return digest
+        path = self.path(digest, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a unique temp name and renamed, so concurrent writers of the same
+        # capture (pages, shard processes) never see a partial blob
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(self.compress(data))
+        os.replace(temp_path, path)
+        self.written += 1
+        return digest
+
+    async def store(self, text):
+        # put() off the event loop; zlib and zstd release the GIL while compressing
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.put, text)
+
+    def open(self, digest):
+        # Text stream over a blob, decompressed as it is read
+        path, codec = self.find(digest)
+        if path is None:
+            raise KeyError(f"No blob {digest} in {self.root}")
+        if codec == "gz":
+            return gzip.open(path, "rt", encoding="utf-8")
+        if zstandard is None:
+            raise RuntimeError(f"Blob {digest} is zstd compressed; pip install zstandard to read it")
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+
+    def chunks(self, digest, size=CHUNK_SIZE):
+        with self.open(digest) as stream:
+            while True:
+                chunk = stream.read(size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def get(self, digest):
+        with self.open(digest) as stream:
+            return stream.read()
+
+    def disk_usage(self):
+        count = 0
+        size = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith(".tmp"):
+                    count += 1
+                    size += os.path.getsize(os.path.join(directory, name))
+        return count, size
+
+
+def looks_like_html(lines):
+    return any(line.lstrip().startswith("<") for line in lines)
+
+
+def migrate(store, results_path, output_path):
+    # Rewrite a results log whose records carry the captured HTML inline as lines:
+    # the HTML moves to the blob store and the record keeps its hash
+    moved = 0
+    with ResultSink(output_path, batch_size=1000) as sink:
+        for result in iter_results(results_path):
+            lines = result.get("technology_stack") or []
+            if "raw_html" not in result and looks_like_html(lines):
+                html = "\n".join(lines)
+                result["raw_html"] = store.put(html)
+                if "technologies" not in result:
+                    result["technologies"] = parse_technology_chunks([html])
+                result["technology_stack"] = technology_lines(result["technologies"])
+                moved += 1
+            sink.write(result)
+    return moved
+
+
+def reparse(store, results_path, output_path):
+    # Re-run the stack parser over every stored capture, streaming each blob back
+    count = 0
+    with ResultSink(output_path, batch_size=1000) as sink:
+        for result in iter_results(results_path):
+            if result.get("raw_html"):
+                result["technologies"] = parse_technology_chunks(store.chunks(result["raw_html"]))
+                count += 1
+            sink.write(result)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and maintain the captured-HTML blob store")
+    parser.add_argument("--root", default=BLOB_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    show = commands.add_parser("cat", help="print one blob")
+    show.add_argument("digest")
+
+    commands.add_parser("stats", help="blob count and size on disk")
+
+    move = commands.add_parser("migrate", help="move inline HTML out of a JSONL results log")
+    move.add_argument("results")
+    move.add_argument("output")
+
+    again = commands.add_parser("reparse", help="rebuild technologies from the stored HTML")
+    again.add_argument("results")
+    again.add_argument("output")
+    args = parser.parse_args(argv)
+
+    store = BlobStore(args.root)
+    if args.command == "cat":
+        for chunk in store.chunks(args.digest):
+            sys.stdout.write(chunk)
+    elif args.command == "stats":
+        count, size = store.disk_usage()
+        print(f"{count} blobs, {size / 1024 / 1024:.1f} MB in {args.root}")
+    elif args.command == "migrate":
+        moved = migrate(store, args.results, args.output)
+        before = os.path.getsize(args.results)
+        after = os.path.getsize(args.output)
+        print(f"Moved HTML of {moved} records into {args.root} ({store.written} new blobs, {store.deduplicated} duplicates)")
+        print(f"Results log: {before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB")
+    else:
+        count = reparse(store, args.results, args.output)
+        print(f"Reparsed {count} records into {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
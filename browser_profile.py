@@ -0,0 +1,94 @@
+import urllib.parse
+
+# Resource types that never affect the text we extract
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "imageset", "texttrack", "beacon", "ping"}
+
+# Analytics, ads and chat widgets; subdomains are matched too
+DENY_HOSTS = {
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "intercom.io",
+    "intercomcdn.com",
+    "crisp.chat",
+    "hubspot.com",
+    "hs-scripts.com",
+    "clarity.ms",
+    "sentry.io",
+    "stripe.com",
+}
+
+# Aborted requests are never downloaded, so savings are estimated from typical sizes
+ESTIMATED_BYTES = {
+    "image": 40000,
+    "imageset": 40000,
+    "media": 500000,
+    "font": 50000,
+    "script": 60000,
+    "stylesheet": 20000,
+    "xhr": 2000,
+    "fetch": 2000,
+}
+DEFAULT_ESTIMATED_BYTES = 5000
+
+
+def host_matches(host, hosts):
+    # True when host is one of hosts or a subdomain of one
+    while host:
+        if host in hosts:
+            return True
+        _, _, host = host.partition(".")
+    return False
+
+
+class BrowserProfile:
+    # Launch options plus a request filter installed on every page we open.
+    # allow_hosts wins over deny_hosts; blocked resource types are dropped from any host.
+    def __init__(self, headless=True, blocked_resource_types=None, allow_hosts=None, deny_hosts=None, launch_args=None):
+        self.headless = headless
+        self.blocked_resource_types = set(BLOCKED_RESOURCE_TYPES if blocked_resource_types is None else blocked_resource_types)
+        self.allow_hosts = set(allow_hosts or ())
+        self.deny_hosts = set(DENY_HOSTS if deny_hosts is None else deny_hosts)
+        self.launch_args = list(launch_args or ())
+        self.stats = {}  # Per page: [blocked requests, estimated bytes saved]
+
+    async def launch(self, playwright):
+        return await playwright.chromium.launch(headless=self.headless, args=self.launch_args)
+
+    def should_block(self, resource_type, url):
+        if resource_type in self.blocked_resource_types:
+            return True
+        host = (urllib.parse.urlsplit(url).hostname or "").lower()
+        if host_matches(host, self.allow_hosts):
+            return False
+        return host_matches(host, self.deny_hosts)
+
+    async def attach(self, page):
+        stats = self.stats.setdefault(page, [0, 0])
+
+        async def handle(route):
+            request = route.request
+            if self.should_block(request.resource_type, request.url):
+                stats[0] += 1
+                stats[1] += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await page.route("**/*", handle)
+        page.on("close", lambda _: self.stats.pop(page, None))
+
+    def take_stats(self, page):
+        # Return and reset (blocked requests, estimated bytes saved) since the last call
+        stats = self.stats.get(page)
+        if stats is None:
+            return 0, 0
+        blocked, saved = stats
+        stats[0] = stats[1] = 0
+        return blocked, saved
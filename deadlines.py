@@ -0,0 +1,43 @@
+from collections import deque
+from metrics import METRICS
+
+
+class AdaptiveDeadlines:
+    # Per-phase deadlines learned from recent wait durations: `multiplier` times the
+    # `percentile` latency of the last `window` waits, clamped between floor_ms and the
+    # phase's static timeout. Until a phase has min_samples waits the static timeout holds.
+    # Waits that hit their deadline are observed too, so a deadline that is too tight
+    # pushes its own percentile up and widens again.
+    def __init__(self, percentile=0.99, multiplier=3.0, floor_ms=2000, window=500, min_samples=30):
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.floor_ms = floor_ms
+        self.window = window
+        self.min_samples = min_samples
+        self.samples = {}
+        self.cached = {}
+
+    def observe(self, phase, seconds):
+        if phase not in self.samples:
+            self.samples[phase] = deque(maxlen=self.window)
+        self.samples[phase].append(seconds)
+        self.cached.pop(phase, None)
+
+    def latency(self, phase):
+        samples = self.samples.get(phase)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def timeout(self, phase, ceiling_ms):
+        if phase in self.cached:
+            return self.cached[phase]
+        latency = self.latency(phase)
+        if latency is None:
+            deadline = ceiling_ms
+        else:
+            deadline = int(min(ceiling_ms, max(self.floor_ms, latency * 1000 * self.multiplier)))
+        self.cached[phase] = deadline
+        METRICS.set_gauge("phase_deadline_ms", deadline, phase=phase)
+        return deadline
@@ -0,0 +1,94 @@
+import json
+import sqlite3
+import time
+from domain_utils import normalize_domain
+
+DAY = 24 * 60 * 60
+
+# How long a result stays fresh, by status. Errors are retried on the next run.
+# "no_data" is a results page without technologies, often one read before its
+# block rendered, so it is looked at again soon.
+STATUS_TTLS = {
+    "success": 21 * DAY,
+    "no_data": 1 * DAY,
+    "no_suggestions": 3 * DAY,
+    "error": 0,
+}
+
+NO_DATA_LINES = (["No data found."], ["Technology stack not found."])
+
+
+def result_status(result):
+    # Older records carry no status field; derive it from the marker lines
+    if "status" in result:
+        return result["status"]
+    stack = result.get("technology_stack") or []
+    if stack == ["No suggestions available"]:
+        return "no_suggestions"
+    if stack and str(stack[0]).startswith("Error"):
+        return "error"
+    if stack in NO_DATA_LINES:
+        return "no_data"
+    return "success"
+
+
+def cache_key(domain):
+    return normalize_domain(domain) or domain
+
+
+class DomainCache:
+    # Last result, status and timestamp per normalized domain, kept in SQLite so
+    # restarts and reruns can skip everything that is still fresh
+    def __init__(self, file_path, ttls=None):
+        self.ttls = dict(STATUS_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.skipped = 0
+        self.connection = sqlite3.connect(file_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS domain_cache ("
+            "domain TEXT PRIMARY KEY, status TEXT NOT NULL, result TEXT NOT NULL, checked_at REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def get(self, domain):
+        row = self.connection.execute(
+            "SELECT status, result, checked_at FROM domain_cache WHERE domain = ?",
+            (cache_key(domain),),
+        ).fetchone()
+        if row is None:
+            return None
+        status, result, checked_at = row
+        return {"status": status, "result": json.loads(result), "checked_at": checked_at}
+
+    def is_fresh(self, domain, now=None):
+        entry = self.get(domain)
+        if entry is None:
+            return False
+        now = time.time() if now is None else now
+        return now - entry["checked_at"] < self.ttls.get(entry["status"], 0)
+
+    def stale_domains(self, domains):
+        # Scheduler filter: yield only domains that are missing or past their TTL,
+        # counting the fresh ones in self.skipped
+        now = time.time()
+        for domain in domains:
+            if self.is_fresh(domain, now):
+                self.skipped += 1
+            else:
+                yield domain
+
+    def record_many(self, results, now=None):
+        now = time.time() if now is None else now
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO domain_cache (domain, status, result, checked_at) VALUES (?, ?, ?, ?)",
+            [
+                (cache_key(result["domain"]), result_status(result), json.dumps(result, ensure_ascii=False), now)
+                for result in results
+            ],
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,152 @@
+import csv
+import gzip
+import hashlib
+import math
+import re
+import urllib.parse
+
+# CSV header names that hold the domain column
+DOMAIN_COLUMNS = {"domain", "domains", "url", "website", "host", "hostname", "site"}
+LABEL = re.compile(r"[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9_])?")
+
+
+def normalize_domain(domain):
+    # Cache and dedupe key: "https://www.JQuery.com/path" and "jquery.com" are the
+    # same lookup. Returns None for values that are not a usable host name.
+    value = domain.strip().lower()
+    if not value:
+        return None
+    if "://" not in value:
+        value = "//" + value
+    try:
+        host = urllib.parse.urlsplit(value).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    host = host.rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        return None
+    # A host name has at least two labels and a non-numeric top level, so ranks
+    # ("1"), numbers ("1.5"), IP addresses and free text are not looked up
+    labels = host.split(".")
+    if len(labels) < 2 or labels[-1].isdigit() or not all(LABEL.fullmatch(label) for label in labels):
+        return None
+    return host
+
+
+def next_prime(n):
+    n |= 1
+    while any(n % d == 0 for d in range(3, math.isqrt(n) + 1, 2)):
+        n += 2
+    return n
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        # A prime size keeps every double-hashing stride coprime with it
+        self.size = next_prime(max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, digest):
+        # Enhanced double hashing: k positions from the two 64-bit halves of one digest.
+        # The growing stride keeps two keys with the same stride from sharing most of
+        # their positions, which plain double hashing allows on small filters.
+        first = int.from_bytes(digest[:8], "little") % self.size
+        second = int.from_bytes(digest[8:], "little") % (self.size - 1) + 1
+        for i in range(self.hashes):
+            yield first
+            first = (first + second) % self.size
+            second = (second + i) % self.size
+
+    def contains(self, digest):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self.positions(digest))
+
+    def add(self, digest):
+        bits = self.bits
+        for p in self.positions(digest):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class DomainDeduper:
+    # Scalable Bloom filter: memory grows with the number of distinct domains at
+    # roughly 4 bytes each, instead of a Python set's ~100. A false positive drops
+    # a domain, so the error rate is kept tiny and halves with every new filter.
+    def __init__(self, initial_capacity=1 << 20, error_rate=1e-7):
+        self.filters = [BloomFilter(initial_capacity, error_rate / 2)]
+        self.error_rate = error_rate / 2
+
+    def add(self, domain):
+        # True when the domain has not been seen before
+        digest = hashlib.blake2b(domain.encode("utf-8"), digest_size=16).digest()
+        for bloom in self.filters:
+            if bloom.contains(digest):
+                return False
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            self.error_rate /= 2
+            current = BloomFilter(current.capacity * 2, self.error_rate)
+            self.filters.append(current)
+        current.add(digest)
+        return True
+
+
+def open_text(file_path):
+    # Plain or gzip text, detected from the magic bytes rather than the suffix
+    with open(file_path, "rb") as raw:
+        gzipped = raw.read(2) == b"\x1f\x8b"
+    if gzipped:
+        return gzip.open(file_path, "rt", encoding="utf-8", errors="replace", newline="")
+    return open(file_path, "r", encoding="utf-8", errors="replace", newline="")
+
+
+def iter_raw_domains(file, csv_input):
+    if not csv_input:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+        return
+    reader = csv.reader(file)
+    column = 0
+    for row in reader:
+        headers = [cell.strip().lower() for cell in row]
+        matches = [i for i, cell in enumerate(headers) if cell in DOMAIN_COLUMNS]
+        if matches:
+            column = matches[0]
+            break
+        # No known header: use the first column holding a host name, so top lists
+        # in "rank,domain" form read the domains rather than the ranks
+        hosts = [i for i, cell in enumerate(row) if normalize_domain(cell)]
+        if hosts:
+            column = hosts[0]
+            yield row[column]
+            break
+    for row in reader:
+        if len(row) > column:
+            yield row[column]
+
+
+def iter_domains(file_path, dedupe=True):
+    # Stream normalized, deduplicated domains one line at a time from plain text,
+    # CSV (.csv / .csv.gz) or gzip input
+    csv_input = file_path.lower().removesuffix(".gz").endswith(".csv")
+    seen = DomainDeduper() if dedupe else None
+    with open_text(file_path) as file:
+        for raw in iter_raw_domains(file, csv_input):
+            domain = normalize_domain(raw)
+            if domain is None:
+                print(f"Skipping invalid domain: {raw.strip()}")
+                continue
+            if seen is not None and not seen.add(domain):
+                continue
+            yield domain
@@ -0,0 +1,506 @@
+import argparse
+import asyncio
+import json
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from domain_utils import iter_domains
+from metrics import METRICS
+from outdated_engine import parse_version
+from result_sink import ResultSink
+from stack_parser import technology_lines
+from worker_pool import TransientError, run_worker_pool
+
+try:
+    import aiohttp
+except ImportError:  # Only the fingerprint backend needs it
+    aiohttp = None
+
+# Browserless detection: fetch a site's HTML, headers and cookies directly and match
+# them against a Wappalyzer-format signature file, emitting the same result records as
+# the browser flow. Only the html, scriptSrc, url, headers, cookies and meta fields are
+# used; js and dom signatures need a live page.
+
+SIGNATURES_FILE = "technology_signatures.json"
+MAX_HTML_BYTES = 2 * 1024 * 1024
+MIN_ANCHOR = 3  # Shortest literal worth keying a pattern on
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+SCRIPT_SRC = re.compile(r"""<script[^>]*\ssrc\s*=\s*["']?([^"'\s>]+)""", re.IGNORECASE)
+META_TAG = re.compile(r"<meta\s[^>]*>", re.IGNORECASE)
+META_ATTRIBUTE = re.compile(r"""(name|property|http-equiv|content)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+# An escape with its arguments (\x41, \u00e9, \N{...}, octal, backreferences) and a counted quantifier
+ESCAPE = re.compile(r"\\(?:x[0-9a-fA-F]{0,2}|u[0-9a-fA-F]{0,4}|U[0-9a-fA-F]{0,8}|N\{[^}]*\}|[0-7]{1,3}|\d{1,2}|.)", re.DOTALL)
+COUNTED = re.compile(r"\{\d*(?:,\d*)?\}")
+VERSION_GROUP = re.compile(r"\\(\d+)")
+VERSION_TERNARY = re.compile(r"\\(\d+)\?([^:]*):(.*)")
+
+
+def as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def parse_pattern(value):
+    # "regex\;version:\1\;confidence:50" -> (regex, version template, confidence)
+    parts = value.split("\\;")
+    version = ""
+    confidence = 100
+    for part in parts[1:]:
+        key, _, argument = part.partition(":")
+        if key == "version":
+            version = argument
+        elif key == "confidence":
+            try:
+                confidence = int(argument)
+            except ValueError:
+                pass
+    return parts[0], version, confidence
+
+
+def required_literal(pattern):
+    # Longest run of plain characters that every match must contain, lowercased.
+    # Empty when the pattern has a top-level alternation or no run of MIN_ANCHOR chars.
+    # Escapes and {m,n} quantifiers end a run, arguments included, so "\x41bc" and
+    # "\d{1,3}" never contribute "41bc" or "1,3".
+    best = ""
+    run = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        literal = None
+        if char == "\\" and i + 1 < len(pattern):
+            i = ESCAPE.match(pattern, i).end()
+        elif char == "{":
+            counted = COUNTED.match(pattern, i)
+            i = counted.end() if counted else i + 1
+        elif char == "[":
+            # Skip the whole character class
+            i += 1
+            if i < len(pattern) and pattern[i] == "^":
+                i += 1
+            if i < len(pattern) and pattern[i] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+        elif char == "(":
+            depth += 1
+            i += 1
+        elif char == ")":
+            depth -= 1
+            i += 1
+        elif char == "|":
+            if depth == 0:
+                return ""
+            i += 1
+        elif char in ".^$*+?}":
+            i += 1
+        else:
+            i += 1
+            if depth == 0:
+                literal = char
+
+        following = pattern[i] if i < len(pattern) else ""
+        if literal is not None and following in ("?", "*", "{"):
+            literal = None  # Optional or counted: not guaranteed to appear
+        if literal is None:
+            best = max(best, run, key=len)
+            run = ""
+            continue
+        run += literal
+        if following == "+":
+            best = max(best, run, key=len)
+            run = ""
+    best = max(best, run, key=len)
+    return best.lower() if len(best) >= MIN_ANCHOR else ""
+
+
+def build_trie(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+    return trie
+
+
+def trie_regex(node):
+    # Prefix-factored alternation, so the combined regex branches per character
+    # instead of trying every word at every position
+    branches = [re.escape(char) + trie_regex(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        return "(?:" + body + ")?"
+    return body
+
+
+def resolve_version(template, match):
+    def group(number):
+        try:
+            return match.group(number) or ""
+        except IndexError:
+            return ""
+
+    ternary = VERSION_TERNARY.fullmatch(template)
+    if ternary:
+        template = ternary.group(2) if group(int(ternary.group(1))) else ternary.group(3)
+    return VERSION_GROUP.sub(lambda found: group(int(found.group(1))), template).strip()
+
+
+class Pattern:
+    def __init__(self, technology, regex, version, confidence):
+        self.technology = technology
+        self.regex = regex
+        self.version = version
+        self.confidence = confidence
+
+
+class FieldIndex:
+    # Every pattern of one field (html, scriptSrc, url) behind a single combined regex
+    # of their required literals. One scan of the text picks the candidate patterns and
+    # only those run; patterns without a usable literal always run.
+    def __init__(self):
+        self.by_anchor = {}
+        self.always = []
+        self.trie = None
+        self.scanner = None
+
+    def add(self, pattern, anchor):
+        if anchor:
+            self.by_anchor.setdefault(anchor, []).append(pattern)
+        else:
+            self.always.append(pattern)
+
+    def compile(self):
+        self.trie = build_trie(self.by_anchor)
+        if self.by_anchor:
+            # Zero-width lookahead so overlapping anchors are all seen
+            self.scanner = re.compile("(?=(" + trie_regex(self.trie) + "))")
+
+    def anchors_in(self, text):
+        found = set()
+        seen = set()
+        for match in self.scanner.finditer(text):
+            word = match.group(1)
+            if word in seen:
+                continue
+            seen.add(word)
+            # The longest anchor at a position wins the alternation; its prefixes count too
+            node = self.trie
+            prefix = ""
+            for char in word:
+                node = node[char]
+                prefix += char
+                if "" in node:
+                    found.add(prefix)
+        return found
+
+    def matches(self, texts):
+        if not texts:
+            return
+        candidates = list(self.always)
+        if self.scanner is not None:
+            for anchor in self.anchors_in("\n".join(texts).lower()):
+                candidates.extend(self.by_anchor[anchor])
+        for pattern in candidates:
+            for text in texts:
+                match = pattern.regex.search(text)
+                if match:
+                    yield pattern, match
+                    break
+
+
+class SignatureSet:
+    # A Wappalyzer-format signature file compiled for matching. The file is either
+    # {"technologies": {...}, "categories": {...}} or a bare technologies mapping.
+    FIELDS = ("html", "scriptSrc", "url")
+    KEYED_FIELDS = ("headers", "cookies", "meta")
+
+    def __init__(self, technologies, categories=None):
+        self.technologies = technologies
+        self.categories = categories or {}
+        self.fields = {field: FieldIndex() for field in self.FIELDS}
+        self.keyed = {field: {} for field in self.KEYED_FIELDS}
+        self.skipped = 0
+        for name, signature in technologies.items():
+            for field in self.FIELDS:
+                for value in as_list(signature.get(field)):
+                    pattern = self.compile_pattern(name, value)
+                    if pattern:
+                        self.fields[field].add(pattern, required_literal(pattern.regex.pattern))
+            for field in self.KEYED_FIELDS:
+                for key, value in (signature.get(field) or {}).items():
+                    for item in as_list(value):
+                        pattern = self.compile_pattern(name, item)
+                        if pattern:
+                            self.keyed[field].setdefault(key.lower(), []).append(pattern)
+        for index in self.fields.values():
+            index.compile()
+        if self.skipped:
+            print(f"Skipped {self.skipped} signature patterns Python's re cannot compile")
+
+    @classmethod
+    def load(cls, file_path=SIGNATURES_FILE):
+        with open(file_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if "technologies" in data:
+            return cls(data["technologies"], data.get("categories"))
+        return cls(data)
+
+    def compile_pattern(self, name, value):
+        regex, version, confidence = parse_pattern(str(value))
+        try:
+            return Pattern(name, re.compile(regex, re.IGNORECASE), version, confidence)
+        except re.error:
+            self.skipped += 1
+            return None
+
+    def category(self, name):
+        for category_id in as_list(self.technologies.get(name, {}).get("cats")):
+            category = self.categories.get(str(category_id))
+            if category:
+                return category.get("name")
+        return None
+
+    def analyze(self, page):
+        # page: {"url", "html", "headers": {name: value}, "cookies": {name: value}}
+        html = page.get("html") or ""
+        detections = {}
+
+        def detect(pattern, match):
+            entry = detections.setdefault(pattern.technology, {"versions": [], "confidence": 0})
+            entry["confidence"] = min(100, entry["confidence"] + pattern.confidence)
+            if pattern.version and match is not None:
+                version = resolve_version(pattern.version, match)
+                if version:
+                    entry["versions"].append(version)
+
+        texts = {
+            "html": [html],
+            "scriptSrc": SCRIPT_SRC.findall(html),
+            "url": [page.get("url") or ""],
+        }
+        for field, index in self.fields.items():
+            for pattern, match in index.matches(texts[field]):
+                detect(pattern, match)
+
+        values = {
+            "headers": {name.lower(): value for name, value in (page.get("headers") or {}).items()},
+            "cookies": {name.lower(): value for name, value in (page.get("cookies") or {}).items()},
+            "meta": meta_tags(html),
+        }
+        for field, patterns in self.keyed.items():
+            for key, value in values[field].items():
+                for pattern in patterns.get(key, ()):
+                    match = pattern.regex.search(value)
+                    if match:
+                        detect(pattern, match)
+
+        # Implied technologies inherit the confidence of what implied them
+        pending = list(detections)
+        while pending:
+            name = pending.pop()
+            for implied in as_list(self.technologies.get(name, {}).get("implies")):
+                implied, _, _ = parse_pattern(implied)
+                if implied in self.technologies and implied not in detections:
+                    detections[implied] = {"versions": [], "confidence": detections[name]["confidence"]}
+                    pending.append(implied)
+        for name in list(detections):
+            for excluded in as_list(self.technologies.get(name, {}).get("excludes")):
+                detections.pop(excluded, None)
+
+        return [
+            {
+                "name": name,
+                "category": self.category(name),
+                "version": best_version(entry["versions"]),
+                "confidence": entry["confidence"],
+            }
+            for name, entry in sorted(detections.items())
+        ]
+
+
+def meta_tags(html):
+    tags = {}
+    for tag in META_TAG.findall(html):
+        attributes = {}
+        for match in META_ATTRIBUTE.finditer(tag):
+            attributes[match.group(1).lower()] = next(value for value in match.groups()[1:] if value is not None)
+        key = attributes.get("name") or attributes.get("property") or attributes.get("http-equiv")
+        if key and "content" in attributes:
+            tags[key.lower()] = attributes["content"]
+    return tags
+
+
+def best_version(versions):
+    if not versions:
+        return None
+    return max(versions, key=lambda version: (parse_version(version) or (), len(version)))
+
+
+def fingerprint_result(domain, technologies):
+    # Same record shape as the browser flow
+    return {
+        "domain": domain,
+        "status": "success" if technologies else "no_data",
+        "technology_stack": technology_lines(technologies),
+        "technologies": technologies,
+    }
+
+
+WORKER_SIGNATURES = None
+
+
+def load_worker_signatures(file_path):
+    # Each matcher process compiles the signature set once
+    global WORKER_SIGNATURES
+    WORKER_SIGNATURES = SignatureSet.load(file_path)
+
+
+def analyze_page(page):
+    return WORKER_SIGNATURES.analyze(page)
+
+
+def response_cookies(response):
+    cookies = {}
+    for hop in list(response.history) + [response]:
+        for name, morsel in hop.cookies.items():
+            cookies[name] = morsel.value
+    return cookies
+
+
+async def fetch_page(session, domain, max_bytes=MAX_HTML_BYTES):
+    # https first, then plain http; redirects are followed and cookies set along the way kept
+    error = None
+    for scheme in ("https", "http"):
+        try:
+            async with session.get(f"{scheme}://{domain}/") as response:
+                # content.read(n) returns as soon as any bytes are buffered, so read
+                # chunks up to the cap; scripts near the end of <body> must not be cut off
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    body += chunk
+                    if len(body) >= max_bytes:
+                        del body[max_bytes:]
+                        break
+                body = bytes(body)
+                try:
+                    html = body.decode(response.charset or "utf-8", errors="replace")
+                except LookupError:
+                    html = body.decode("utf-8", errors="replace")
+                return {
+                    "url": str(response.url),
+                    "status": response.status,
+                    "headers": {name: ", ".join(response.headers.getall(name)) for name in set(response.headers.keys())},
+                    "cookies": response_cookies(response),
+                    "html": html,
+                }
+        except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeError) as e:
+            error = e
+    raise TransientError(f"Could not fetch {domain}: {error}")
+
+
+class SharedSession:
+    # Stands in for a page in run_worker_pool: every worker shares one pooled session,
+    # which the engine closes itself
+    def __init__(self, session):
+        self.session = session
+
+    async def close(self):
+        pass
+
+
+class FingerprintEngine:
+    # Alternative to the browser flow: pooled HTTP fetches on the event loop, signature
+    # matching in worker processes so large pages never block the fetches
+    def __init__(self, signatures_path=SIGNATURES_FILE, concurrency=100, timeout_seconds=15,
+                 max_bytes=MAX_HTML_BYTES, workers=None, retry=None):
+        self.concurrency = concurrency
+        self.timeout_seconds = timeout_seconds
+        self.max_bytes = max_bytes
+        self.retry = retry
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=load_worker_signatures, initargs=(signatures_path,))
+
+    async def analyze(self, page):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, analyze_page, page)
+
+    async def run(self, domains, sink):
+        if aiohttp is None:
+            raise RuntimeError("The fingerprint backend needs aiohttp: pip install aiohttp")
+
+        def record(result):
+            METRICS.increment("domains", status=result["status"])
+            with METRICS.phase("results_write"):
+                sink.write(result)
+
+        async def process(client, domain):
+            try:
+                with METRICS.phase("fingerprint_fetch"):
+                    page = await fetch_page(client.session, domain, self.max_bytes)
+            except TransientError as e:
+                e.result = {"domain": domain, "status": "error", "technology_stack": [f"Error: {e}"], "technologies": []}
+                raise
+            try:
+                with METRICS.phase("fingerprint_match"):
+                    technologies = await self.analyze(page)
+            except Exception as e:
+                # A broken matcher pool must still leave a record for the domain
+                print(f"Failed to match signatures for {domain}: {e}")
+                record({"domain": domain, "status": "error", "technology_stack": [f"Error: {e}"], "technologies": []})
+                return
+            record(fingerprint_result(domain, technologies))
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=4, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout_seconds)
+        async with aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers={"User-Agent": USER_AGENT},
+            cookie_jar=aiohttp.DummyCookieJar(),  # Cookies are read per response, never sent on
+        ) as session:
+            client = SharedSession(session)
+
+            async def open_client():
+                return client
+
+            await run_worker_pool(
+                domains,
+                open_client,
+                process,
+                concurrency=self.concurrency,
+                requests_per_second=0,  # Every domain is a different host
+                retry=self.retry,
+                on_give_up=lambda domain, error: record(error.result),
+            )
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detect technologies without a browser, from a Wappalyzer-format signature file")
+    parser.add_argument("domains", help="text, CSV or gzip file of domains")
+    parser.add_argument("--signatures", default=SIGNATURES_FILE)
+    parser.add_argument("--output", default="fingerprint_results.jsonl")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=15, help="seconds per site")
+    args = parser.parse_args(argv)
+
+    engine = FingerprintEngine(args.signatures, args.concurrency, args.timeout)
+    try:
+        with ResultSink(args.output) as sink:
+            asyncio.run(engine.run(iter_domains(args.domains), sink))
+    finally:
+        engine.close()
+    print(json.dumps(METRICS.summary()["counters"], indent=4))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
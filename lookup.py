@@ -0,0 +1,23 @@
+import urllib.parse
+
+LOOKUP_URL = "https://www.wappalyzer.com/lookup/{domain}/"
+
+
+def lookup_url(domain, template=LOOKUP_URL):
+    return template.format(domain=urllib.parse.quote(domain, safe=""))
+
+
+async def open_lookup(page, domain, ready_selector, root_selector, waits, template=LOOKUP_URL):
+    # Navigate straight to the domain's result page. Returns False when it does not
+    # resolve, so the caller can fall back to the typed-suggestion flow.
+    try:
+        with waits.measure("navigation"):
+            response = await page.goto(lookup_url(domain, template), timeout=waits.timeout("navigation"))
+        if response is not None and response.status >= 400:
+            print(f"Lookup page returned {response.status} for {domain}, falling back to search")
+            return False
+        await waits.wait_for_results(page, ready_selector, root_selector, phase="lookup")
+        return True
+    except Exception as e:
+        print(f"Direct lookup failed for {domain}, falling back to search. Error: {e}")
+        return False
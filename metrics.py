@@ -0,0 +1,149 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, float("inf"))
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in key) + "}"
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+    def quantile(self, fraction):
+        # Upper bound of the bucket holding the requested rank; None in the +Inf bucket,
+        # which has no bound (and float("inf") is not valid JSON)
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank and count:
+                return bound if bound != float("inf") else None
+        return None
+
+
+class Metrics:
+    # Phase timings, outcome counters and gauges for one run, exported as a JSON
+    # summary and as a Prometheus textfile
+    def __init__(self, prefix="outdated_components"):
+        self.prefix = prefix
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.time()
+
+    def observe(self, name, seconds, **labels):
+        key = (name, label_key(labels))
+        if key not in self.histograms:
+            self.histograms[key] = Histogram()
+        self.histograms[key].observe(seconds)
+
+    @contextmanager
+    def phase(self, name):
+        # Time a block, failed or not, as phase_seconds{phase=name}
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("phase_seconds", time.perf_counter() - start, phase=name)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, label_key(labels))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        self.gauges[(name, label_key(labels))] = value
+
+    async def sample_browser_memory(self, page, **labels):
+        # JS heap of the page's renderer; Chromium only
+        try:
+            heap = await page.evaluate("() => performance.memory ? performance.memory.usedJSHeapSize : null")
+        except Exception as e:
+            print(f"Error sampling browser memory: {e}")
+            return
+        if heap is not None:
+            self.set_gauge("browser_js_heap_bytes", heap, **labels)
+
+    def summary(self):
+        return {
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "histograms": [
+                {
+                    "name": name,
+                    "labels": dict(key),
+                    "count": histogram.count,
+                    "sum_seconds": round(histogram.total, 3),
+                    "mean_seconds": round(histogram.total / histogram.count, 3) if histogram.count else None,
+                    "p50_seconds": histogram.quantile(0.50),
+                    "p95_seconds": histogram.quantile(0.95),
+                }
+                for (name, key), histogram in sorted(self.histograms.items())
+            ],
+            "counters": [{"name": name, "labels": dict(key), "value": value} for (name, key), value in sorted(self.counters.items())],
+            "gauges": [{"name": name, "labels": dict(key), "value": value} for (name, key), value in sorted(self.gauges.items())],
+        }
+
+    def prometheus_lines(self):
+        lines = []
+        typed = set()
+
+        def declare(metric, kind):
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+
+        for (name, key), histogram in sorted(self.histograms.items()):
+            metric = f"{self.prefix}_{name}"
+            declare(metric, "histogram")
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{metric}_bucket{format_labels(key + (('le', le),))} {cumulative}")
+            lines.append(f"{metric}_sum{format_labels(key)} {histogram.total}")
+            lines.append(f"{metric}_count{format_labels(key)} {histogram.count}")
+        for (name, key), value in sorted(self.counters.items()):
+            declare(f"{self.prefix}_{name}_total", "counter")
+            lines.append(f"{self.prefix}_{name}_total{format_labels(key)} {value}")
+        for (name, key), value in sorted(self.gauges.items()):
+            declare(f"{self.prefix}_{name}", "gauge")
+            lines.append(f"{self.prefix}_{name}{format_labels(key)} {value}")
+        return lines
+
+    def export_json(self, file_path):
+        write_atomically(file_path, json.dumps(self.summary(), indent=4) + "\n")
+
+    def export_prometheus(self, file_path):
+        write_atomically(file_path, "\n".join(self.prometheus_lines()) + "\n")
+
+
+def write_atomically(file_path, text):
+    # node_exporter's textfile collector must never see a half-written file
+    temp_path = file_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(temp_path, file_path)
+
+
+METRICS = Metrics()
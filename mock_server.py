@@ -0,0 +1,223 @@
+import argparse
+import hashlib
+import html
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Stand-in for the lookup site: the same selectors the scripts rely on, with
+# configurable latency and failure rates, so runs can be measured offline
+
+TECHNOLOGIES = [
+    ("javascript-libraries", "JavaScript libraries", "jquery", "jQuery", ["1.12.4", "3.4.1", "3.7.1"]),
+    ("javascript-libraries", "JavaScript libraries", "lodash", "Lodash", ["4.17.15", "4.17.21"]),
+    ("ui-frameworks", "UI frameworks", "bootstrap", "Bootstrap", ["3.3.7", "4.6.2", "5.3.3"]),
+    ("web-servers", "Web servers", "nginx", "Nginx", ["1.18.0", "1.26.2", None]),
+    ("programming-languages", "Programming languages", "php", "PHP", ["7.4.33", "8.2.25", None]),
+    ("cms", "CMS", "wordpress", "WordPress", ["6.2.0", "6.6.2"]),
+    ("analytics", "Analytics", "google-analytics", "Google Analytics", [None]),
+    ("cdn", "CDN", "cloudflare", "Cloudflare", [None]),
+]
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>Lookup</title></head>
+<body>
+<header>
+  {account}
+</header>
+<main>{content}</main>
+<script>{script}</script>
+</body></html>
+"""
+
+SEARCH_BOX = """
+<div class="search">
+  <input id="input-80" type="text" autocomplete="off">
+  <ul id="suggestions"></ul>
+</div>
+"""
+
+HOME_CONTENT = SEARCH_BOX + "{login_form}\n"
+
+LOGIN_FORM = """
+<form id="login" style="display: none">
+  <input id="input-355" type="email">
+  <input id="input-356" type="password">
+  <button type="submit">Sign in</button>
+</form>
+"""
+
+HOME_SCRIPT = """
+const input = document.getElementById('input-80');
+const list = document.getElementById('suggestions');
+let pending = 0;
+function open(domain) { window.location.href = '/lookup/' + encodeURIComponent(domain) + '/'; }
+input.addEventListener('input', () => {
+  const query = input.value.trim();
+  const ticket = ++pending;
+  if (!query) { list.innerHTML = ''; return; }
+  fetch('/api/suggest?q=' + encodeURIComponent(query)).then(r => r.json()).then(items => {
+    if (ticket !== pending) return;
+    list.innerHTML = '';
+    for (const item of items) {
+      const li = document.createElement('li');
+      li.textContent = item;
+      li.addEventListener('click', () => { input.value = item; list.innerHTML = ''; open(item); });
+      list.appendChild(li);
+    }
+  }).catch(() => {});
+});
+input.addEventListener('keydown', (event) => {
+  if (event.key === 'Enter' && input.value.trim()) open(input.value.trim());
+});
+const signIn = document.getElementById('sign-in');
+const login = document.getElementById('login');
+if (signIn) signIn.addEventListener('click', () => { login.style.display = 'block'; });
+if (login) login.addEventListener('submit', (event) => {
+  event.preventDefault();
+  const body = JSON.stringify({email: document.getElementById('input-355').value});
+  fetch('/api/login', {method: 'POST', body}).then(() => window.location.reload());
+});
+"""
+
+RESULT_SCRIPT = """
+setTimeout(() => {
+  document.getElementById('result').innerHTML = document.getElementById('result-template').innerHTML;
+}, %d);
+"""
+
+ACCOUNT_SIGNED_OUT = '<button class="v-btn"><span class="v-btn__content" id="sign-in">Sign in</span></button>'
+ACCOUNT_SIGNED_IN = '<a href="/logout">Logout</a>'
+
+
+class MockConfig:
+    def __init__(self, latency_ms=50, jitter_ms=20, render_ms=50, failure_rate=0.0, no_suggestion_rate=0.1, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.render_ms = render_ms
+        self.failure_rate = failure_rate
+        self.no_suggestion_rate = no_suggestion_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def roll(self):
+        with self.lock:
+            return self.random.random()
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+
+
+def domain_hash(domain):
+    return int.from_bytes(hashlib.blake2b(domain.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def has_suggestion(config, domain):
+    # Deterministic per domain, so reruns see the same "no suggestions" set
+    return domain_hash(domain) % 10000 >= config.no_suggestion_rate * 10000
+
+
+def technology_stack_html(domain):
+    chooser = random.Random(domain_hash(domain))
+    rows = ['<h3 class="mb-4">Technology stack</h3>', '<div class="technology-list">']
+    for category_slug, category, slug, name, versions in chooser.sample(TECHNOLOGIES, chooser.randint(2, 6)):
+        version = chooser.choice(versions)
+        rows.append(f"<h4>{category}</h4>")
+        rows.append(f'<a href="/technologies/{category_slug}/{slug}/">{name}</a>')
+        if version:
+            rows.append(f"<span>{version}</span>")
+    rows.append("</div>")
+    return "\n".join(rows)
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def signed_in(self):
+            return "session=1" in (self.headers.get("Cookie") or "")
+
+        def send(self, status, body, content_type="text/html; charset=utf-8", headers=()):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def page(self, content, script=""):
+            account = ACCOUNT_SIGNED_IN if self.signed_in() else ACCOUNT_SIGNED_OUT
+            return PAGE.format(account=account, content=content, script=script)
+
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            config.delay()
+            if config.roll() < config.failure_rate:
+                self.send(500, "Internal Server Error", "text/plain")
+            elif url.path == "/":
+                login_form = "" if self.signed_in() else LOGIN_FORM
+                self.send(200, self.page(HOME_CONTENT.format(login_form=login_form), HOME_SCRIPT))
+            elif url.path == "/api/suggest":
+                query = urllib.parse.parse_qs(url.query).get("q", [""])[0].strip().lower()
+                items = [query] if query and has_suggestion(config, query) else []
+                self.send(200, json.dumps(items), "application/json")
+            elif url.path.startswith("/lookup/"):
+                domain = urllib.parse.unquote(url.path[len("/lookup/"):].strip("/")).lower()
+                if not has_suggestion(config, domain):
+                    self.send(404, self.page("<p>No results</p>"))
+                    return
+                template = f'<template id="result-template">{technology_stack_html(domain)}</template>'
+                # The typed flow presses Enter in the search box after clicking a suggestion,
+                # so the result page keeps one in its layout
+                content = f'{SEARCH_BOX}<h1>{html.escape(domain)}</h1>{template}<div class="row"><div class="col-sm-6 col-12" id="result"></div></div>'
+                self.send(200, self.page(content, HOME_SCRIPT + RESULT_SCRIPT % config.render_ms))
+            elif url.path == "/logout":
+                self.send(302, "", headers=[("Location", "/"), ("Set-Cookie", "session=; Path=/; Max-Age=0")])
+            else:
+                self.send(404, "Not Found", "text/plain")
+
+        def do_POST(self):
+            config.delay()
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path == "/api/login":
+                self.send(200, "{}", "application/json", [("Set-Cookie", "session=1; Path=/")])
+            else:
+                self.send(404, "Not Found", "text/plain")
+
+    return Handler
+
+
+def start_mock_server(host="127.0.0.1", port=0, config=None):
+    # Serve in a background thread; returns the server and its base URL
+    server = ThreadingHTTPServer((host, port), make_handler(config or MockConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the local stand-in lookup server")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--no-suggestion-rate", type=float, default=0.1)
+    args = parser.parse_args()
+    config = MockConfig(args.latency_ms, failure_rate=args.failure_rate, no_suggestion_rate=args.no_suggestion_rate)
+    server, base_url = start_mock_server(port=args.port, config=config)
+    print(f"Mock lookup server listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
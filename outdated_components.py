@@ -1,7 +1,51 @@
 import asyncio
-import json
+import itertools
 import os
 from playwright.async_api import async_playwright
+from blob_store import BlobStore
+from browser_profile import BrowserProfile
+from deadlines import AdaptiveDeadlines
+from domain_cache import DomainCache
+from domain_utils import iter_domains
+from fingerprint import FingerprintEngine
+from lookup import open_lookup
+from metrics import METRICS
+from result_sink import FanoutSink, ResultSink, export_json, import_json
+from result_store import ResultStore
+from session_store import forget_session, open_session
+from snapshots import SnapshotRecorder
+from stack_parser import StackParserPool, technology_lines
+from wait_strategy import WaitStrategy
+from worker_pool import RetryPolicy, TransientError, run_worker_pool
+
+RESULTS_LOG = "website_analysis_results.jsonl"
+RESULTS_FILE = "website_analysis_results.json"
+CACHE_FILE = "domain_cache.sqlite3"
+STORE_FILE = "website_analysis_results.sqlite3"  # Indexed copy for technology/version queries
+SNAPSHOT_FILE = "snapshots.sqlite3"
+CHANGES_LOG = "technology_changes.jsonl"  # Only what changed since the previous scan
+METRICS_JSON = "metrics.json"
+METRICS_PROM = "metrics.prom"  # Point this at the node_exporter textfile directory
+PERSIST_SESSIONS = True  # Keep each account signed in between runs via sessions/
+METRICS_EVERY = 50  # Sample browser memory and refresh the metric files every N domains
+HOME_URL = "https://www.wappalyzer.com/"
+LOOKUP_URL = HOME_URL + "lookup/{domain}/"
+DETECTION_BACKEND = "browser"  # "fingerprint" skips the site UI and matches fetched pages against SIGNATURES_FILE
+SIGNATURES_FILE = "technology_signatures.json"  # Wappalyzer-format; drop in the full upstream set for wider coverage
+FINGERPRINT_CONCURRENCY = 100  # Sites fetched at once by the fingerprint backend
+LOOKUP_MODE = "direct"  # "direct" opens LOOKUP_URL, "typed" always goes through the search box
+RESULT_SELECTOR = 'main'
+TECHNOLOGY_STACK_SELECTOR = 'main :text("Technology stack")'
+CONCURRENCY = 4  # Pages working in parallel inside the logged-in context
+REQUESTS_PER_SECOND = 1.0  # Global lookup ceiling across all pages
+RATE_LIMITER = None  # sharded_runner.py swaps in one limiter shared by every worker process
+PAGE_MAX_DOMAINS = 200  # Replace a worker's page after this many lookups...
+PAGE_MAX_HEAP_MB = 512  # ...or once its renderer JS heap grows past this
+WAITS = WaitStrategy(deadlines=AdaptiveDeadlines())  # Learned deadlines; FixedDelayWaitStrategy() restores the old fixed delays
+RETRY = RetryPolicy(max_attempts=3, base_delay=5.0, max_delay=120.0)  # Backoff for transient failures before an "error" record is written
+PARSER = StackParserPool()  # Turns captured HTML into technology records off the event loop
+BLOBS = BlobStore()  # Captured HTML, compressed and deduplicated; records keep only its hash
+PROFILE = BrowserProfile()  # Headless with images, fonts, media and trackers blocked; headless=False to watch
 
 def read_credentials(file_path):
     credentials = []
@@ -19,38 +63,34 @@ def read_credentials(file_path):
     return credentials
 
 def read_domains(file_path):
-    domains = []
+    # Stream normalized, deduplicated domains from a text, CSV or gzip file
     try:
-        with open(file_path, 'r') as file:
-            domains = [line.strip() for line in file.readlines() if line.strip()]
+        yield from iter_domains(file_path)
     except Exception as e:
         print(f"Error reading domains file: {e}")
-    return domains
 
-async def fetch_technology_stack(page, domain):
+async def fetch_technology_stack(page, domain, waits=WAITS):
     try:
-        # Focus on the input field and type the domain
+        # Focus on the input field
         await page.click('#input-80')
-        await page.type('#input-80', (" " + domain), delay=350)
-        
-        # Wait for the suggestion to appear
-        suggestion_selector = f'text="{domain}"'
+
         try:
-            await page.wait_for_selector(suggestion_selector, timeout=15000)
-            # Click the correct suggestion
-            await page.click(suggestion_selector)
-            # Wait for the technology stack to load
-            await page.wait_for_load_state('networkidle')
-            await asyncio.sleep(5)  # Adding a delay to ensure all dynamic content is loaded
-
-            # Extract technology stack information
+            with METRICS.phase("fetch_search"):
+                # Type the domain and wait for its suggestion to appear
+                suggestion_selector = await waits.search(page, '#input-80', domain)
+                # Click the correct suggestion
+                await page.click(suggestion_selector)
+
+            # Wait until the technology list is rendered and has stopped changing
             tech_stack_selector = '.technology-list'  # Adjust this to match the actual selector
-            await page.wait_for_selector(tech_stack_selector, timeout=20000)  # Ensure the technology list is loaded
+            with METRICS.phase("fetch_results_wait"):
+                await waits.wait_for_results(page, tech_stack_selector, tech_stack_selector)
 
             tech_stack_element = await page.query_selector(tech_stack_selector)
 
             if tech_stack_element:
-                tech_stack_text = await tech_stack_element.inner_text()
+                with METRICS.phase("fetch_extract"):
+                    tech_stack_text = await tech_stack_element.inner_text()
                 return tech_stack_text.strip().split('\n')  # Splitting into list if required
             else:
                 print(f"Technology stack not found for {domain}")
@@ -66,91 +106,146 @@ async def fetch_technology_stack(page, domain):
         print(f"Error fetching technology stack for {domain}: {e}")
         return ["Error occurred"]
 
-async def analyze_websites(page, websites, results_file):
+async def open_lookup_page(context, waits=WAITS):
+    # Open a worker page on the logged-in context, parked on the search box
+    page = await context.new_page()
+    await PROFILE.attach(page)
+    await page.goto(HOME_URL)
+    await waits.wait_for_search_box(page, '#input-80')
+    return page
+
+async def extract_result(page, website):
+    # Retrieve all visible text from specific parts of the page
+    result_element = await page.query_selector(RESULT_SELECTOR)  # Adjust selector as needed
+    if result_element:
+        page_html = await result_element.inner_html()
+        # Parse in a worker process while the raw HTML goes to the blob store
+        with METRICS.phase("parse"):
+            technologies, raw_html = await asyncio.gather(PARSER.parse(page_html), BLOBS.store(page_html))
+        technology_stack = technology_lines(technologies)
+    else:
+        technology_stack = ["No data found."]
+        technologies = []
+        raw_html = None
+
+    # Prepare result for JSON
+    result = {
+        "domain": website,
+        "status": "success" if technologies else "no_data",
+        "technology_stack": technology_stack,  # One "Name version" line per technology
+        "technologies": technologies,  # Structured records parsed in a worker process
+        "raw_html": raw_html  # Hash of the captured block in BLOBS, for reparsing
+    }
+    return result
+
+async def analyze_website(page, website, waits=WAITS):
     try:
-        # Wait for the URL input field to be available
-        await page.wait_for_selector('#input-80', timeout=60000)
+        print(f"Analyzing website: {website}")
+
+        # Open the result page directly; fall back to the search box if it does not resolve
+        if LOOKUP_MODE == "direct":
+            with METRICS.phase("direct_lookup"):
+                opened = await open_lookup(page, website, TECHNOLOGY_STACK_SELECTOR, RESULT_SELECTOR, waits, LOOKUP_URL)
+            if opened:
+                with METRICS.phase("extract"):
+                    return await extract_result(page, website)
+
+        # The typed flow starts from a fresh home page
+        if page.url != HOME_URL:
+            with METRICS.phase("home_reset"):
+                await page.goto(HOME_URL)
+                await waits.wait_for_search_box(page, '#input-80')
+
+        # Click on the input field to focus
+        await page.click('#input-80')
 
-        # Loop through each website
-        for website in websites:
-            try:
-                print(f"Analyzing website: {website}")
-
-                # Click on the input field to focus
-                await page.click('#input-80')
-
-                # Type the website URL slowly to allow suggestion box to appear
-                await page.type('#input-80', (" " + website), delay=350)  # Increased delay to simulate slower typing
-
-                # Wait for the suggestion box to appear
-                suggestion_selector = f'text="{website}"'
-                try:
-                    await page.wait_for_selector(suggestion_selector, timeout=10000)
-                    # Click the correct suggestion
-                    await page.click(suggestion_selector)
-                    print(f"Suggestion found and clicked for: {website}")
-
-                    # Submit the search (if needed; often clicking the suggestion is enough)
-                    await page.press('#input-80', 'Enter')
-
-                    # Wait for the results to load
-                    await page.wait_for_load_state('networkidle')
-
-                    # Retrieve all visible text from specific parts of the page
-                    result_element = await page.query_selector('main')  # Adjust selector as needed
-                    if result_element:
-                        page_text = await result_element.inner_text()
-                    else:
-                        page_text = "No data found."
-
-                    # Prepare result for JSON
-                    result = {
-                        "domain": website,
-                        "technology_stack": page_text.strip().split('\n')  # Splitting into list if required
-                    }
-
-                    # Add the result to the JSON output and write immediately
-                    with open(results_file, "r+", encoding="utf-8") as file:
-                        data = json.load(file)
-                        data.append(result)
-                        file.seek(0)
-                        json.dump(data, file, indent=4)
-
-                except Exception as e:
-                    print(f"No suggestions available for {website}, skipping. Error: {e}")
-                    result = {
-                        "domain": website,
-                        "technology_stack": ["No suggestions available"]
-                    }
-
-                    # Add the result to the JSON output and write immediately
-                    with open(results_file, "r+", encoding="utf-8") as file:
-                        data = json.load(file)
-                        data.append(result)
-                        file.seek(0)
-                        json.dump(data, file, indent=4)
-
-                # Go back to the home page to reset the search
-                await page.goto("https://www.wappalyzer.com/")
-                await page.wait_for_load_state('networkidle')  # Wait for the home page to fully load
+        try:
+            with METRICS.phase("search"):
+                # Type the website URL and wait for the suggestion box to answer
+                suggestion_selector = await waits.search(page, '#input-80', website)
+        except TimeoutError as e:
+            # The search answered without this domain: a real "no data" outcome,
+            # unlike the failures further down, which are retried
+            print(f"No suggestions available for {website}, skipping. Error: {e}")
+            return {
+                "domain": website,
+                "status": "no_suggestions",
+                "technology_stack": ["No suggestions available"],
+                "technologies": []
+            }
+
+        # Click the correct suggestion
+        await page.click(suggestion_selector)
+        print(f"Suggestion found and clicked for: {website}")
+
+        # Submit the search (if needed; often clicking the suggestion is enough)
+        await page.press('#input-80', 'Enter')
+
+        # Wait for the results page to load
+        with METRICS.phase("results_wait"):
+            await waits.wait_for_navigation(page)
+
+            # Wait for the "Technology stack" heading to be visible and its block to settle
+            await waits.wait_for_results(page, TECHNOLOGY_STACK_SELECTOR, RESULT_SELECTOR)
+        with METRICS.phase("extract"):
+            result = await extract_result(page, website)
 
-            except Exception as e:
-                print(f"Error processing {website}: {e}")
-                result = {
-                    "domain": website,
-                    "technology_stack": [f"Error: {e}"]
-                }
-
-                # Add the result to the JSON output and write immediately
-                with open(results_file, "r+", encoding="utf-8") as file:
-                    data = json.load(file)
-                    data.append(result)
-                    file.seek(0)
-                    json.dump(data, file, indent=4)
-
-            # Optional sleep to avoid overloading the server
-            await asyncio.sleep(2)
+    except Exception as e:
+        print(f"Error processing {website}: {e}")
+        result = {
+            "domain": website,
+            "status": "error",
+            "technology_stack": [f"Error: {e}"],
+            "technologies": []
+        }
+
+    return result
+
+def export_metrics():
+    METRICS.export_json(METRICS_JSON)
+    METRICS.export_prometheus(METRICS_PROM)
+
+async def analyze_websites(context, websites, sink):
+    processed = itertools.count(1)
+
+    def record(result):
+        METRICS.increment("domains", status=result["status"])
+        # Append the result to the JSONL log; the sink flushes in batches
+        with METRICS.phase("results_write"):
+            sink.write(result)
+
+    async def process(page, website):
+        with METRICS.phase("domain"):
+            result = await analyze_website(page, website)
+
+        blocked, saved = PROFILE.take_stats(page)
+        METRICS.increment("blocked_requests", blocked)
+        METRICS.increment("estimated_bytes_saved", saved)
+        print(f"Blocked {blocked} requests (~{saved // 1024} KB) for {website}")
+
+        if result["status"] == "error":
+            # Hand it back to the pool for a retry; the error is only recorded once attempts run out
+            raise TransientError(result["technology_stack"][0], result)
+        record(result)
+
+        if next(processed) % METRICS_EVERY == 0:
+            await METRICS.sample_browser_memory(page)
+            export_metrics()
 
+    try:
+        # Spread the list over CONCURRENCY pages; the rate limiter replaces the fixed sleep
+        await run_worker_pool(
+            websites,
+            lambda: open_lookup_page(context),
+            process,
+            concurrency=CONCURRENCY,
+            requests_per_second=REQUESTS_PER_SECOND,
+            max_items_per_page=PAGE_MAX_DOMAINS,
+            max_heap_mb=PAGE_MAX_HEAP_MB,
+            retry=RETRY,
+            on_give_up=lambda website, error: record(error.result),
+            limiter=RATE_LIMITER,
+        )
     except Exception as e:
         print(f"Error during website analysis: {e}")
         return
@@ -160,91 +255,140 @@ async def logout(page):
         # Add logout functionality based on the website's structure
         print("Logging out...")
         await page.click('text="Logout"')  # Example selector for the logout button
-        await page.wait_for_load_state('networkidle')
+        await WAITS.wait_for_navigation(page)
         print("Logout successful.")
     except Exception as e:
         print(f"Error during logout: {e}")
 
-async def main():
-    # Load credentials
-    credentials_list = read_credentials('credentials.txt')
-    if not credentials_list:
-        print("Failed to load credentials. Please check the credentials file.")
-        return
+async def login(page, email, password):
+    # Go to Wappalyzer main page
+    with METRICS.phase("login_page"):
+        await page.goto(HOME_URL)
+        await WAITS.wait_for_navigation(page)
 
-    # Load domains
-    websites = read_domains('domains.txt')
-    if not websites:
-        print("No websites to analyze. Please check the domains file.")
-        return
+    # Click the "Sign in" button
+    try:
+        await page.click('span.v-btn__content >> text="Sign in"')
+    except Exception as e:
+        raise RuntimeError(f"Error clicking 'Sign in' button for {email}: {e}")
 
-    # Check if output files exist, if not create them
-    if not os.path.exists("website_analysis_results.json"):
-        print("Creating website_analysis_results.json")
-        with open("website_analysis_results.json", "w", encoding="utf-8") as json_file:
-            json.dump([], json_file)  # Create an empty JSON file
+    # Wait for the email input field to be available
+    try:
+        with METRICS.phase("login_form"):
+            await WAITS.wait_for_login_form(page, '#input-355')
+    except Exception as e:
+        raise RuntimeError(f"Error waiting for email input field for {email}: {e}")
 
-    if not os.path.exists("domains_without_suggestions.txt"):
-        print("Creating domains_without_suggestions.txt")
-        with open("domains_without_suggestions.txt", "w", encoding="utf-8") as file:
-            pass  # Create an empty file
+    # Fill in the login form
+    await page.fill('#input-355', email)  # Email field
+    await page.fill('#input-356', password)  # Password field
+    await page.click('button[type="submit"]')
+
+    # Check if login was successful: the login form goes away once signed in
+    try:
+        with METRICS.phase("login_submit"):
+            await WAITS.wait_for_login(page, '#input-355')
+    except Exception as e:
+        print(f"Login likely failed for {email}, but proceeding with domain analysis anyway: {e}")
 
+async def is_signed_in(page):
+    # Cheap session probe: only signed-in users get a Logout link on the home page
+    with METRICS.phase("session_probe"):
+        await page.goto(HOME_URL)
+        try:
+            await WAITS.wait_for_signed_in(page, 'text="Logout"')
+            return True
+        except Exception:
+            return False
+
+async def analyze_with_accounts(credentials_list, websites, sink):
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)  # Non-headless mode for debugging
+        browser = await PROFILE.launch(p)
         for EMAIL, PASSWORD in credentials_list:
             print(f"Logging in with account: {EMAIL}")
+            context = None
             try:
-                context = await browser.new_context()
-                page = await context.new_page()
-
-                # Go to Wappalyzer main page
-                await page.goto("https://www.wappalyzer.com/")
-                await page.wait_for_load_state('networkidle')  # Wait for the network to be idle
-
-                # Click the "Sign in" button
-                try:
-                    await page.click('span.v-btn__content >> text="Sign in"')
-                    await page.wait_for_load_state('networkidle')  # Wait for the network to be idle
-                except Exception as e:
-                    print(f"Error clicking 'Sign in' button for {EMAIL}: {e}")
-                    await browser.close()
-                    continue  # Move to the next set of credentials
-
-                # Wait for the email input field to be available
-                try:
-                    await page.wait_for_selector('#input-355', timeout=120000)  # Increased timeout to 120 seconds
-                except Exception as e:
-                    print(f"Error waiting for email input field for {EMAIL}: {e}")
-                    await browser.close()
-                    continue  # Move to the next set of credentials
-
-                # Fill in the login form
-                await page.fill('#input-355', EMAIL)  # Email field
-                await page.fill('#input-356', PASSWORD)  # Password field
-                await page.click('button[type="submit"]')
-
-                # Check if login was successful by verifying a user-specific element or page change
-                try:
-                    # Instead of checking for a specific element, wait for a certain time and assume login success
-                    await asyncio.sleep(5)
-                    print(f"Proceeding with domain analysis for {EMAIL}")
-                except Exception as e:
-                    print(f"Login likely failed for {EMAIL}, but proceeding with domain analysis anyway: {e}")
+                # Reuse the account's saved session when it is still valid, else sign in
+                context, page, reused = await open_session(browser, EMAIL, PASSWORD, login, is_signed_in, PROFILE.attach)
+                METRICS.increment("logins", session="reused" if reused else "fresh")
+                print(f"Proceeding with domain analysis for {EMAIL}" + (" (saved session)" if reused else ""))
 
                 # Analyze websites using the current account
-                await analyze_websites(page, websites, "website_analysis_results.json")
+                await analyze_websites(context, websites, sink)
 
-                # Logout after processing all domains
-                await logout(page)
+                # Logging out would invalidate the saved session, so only do it when not persisting
+                if not PERSIST_SESSIONS:
+                    await logout(page)
+                    forget_session(EMAIL)
 
             except Exception as e:
                 print(f"Unexpected error for account {EMAIL}: {e}")
 
             finally:
                 # Ensure context is closed properly
-                await context.close()
+                if context is not None:
+                    await context.close()
 
         await browser.close()
 
-# Run the main function
-asyncio.run(main())
+async def main():
+    # Load credentials; the fingerprint backend never signs in
+    credentials_list = read_credentials('credentials.txt') if DETECTION_BACKEND == "browser" else []
+    if DETECTION_BACKEND == "browser" and not credentials_list:
+        print("Failed to load credentials. Please check the credentials file.")
+        return
+
+    # Load domains; they are streamed from the file, never held in memory as a whole
+    websites = read_domains('domains.txt')
+    first_website = next(websites, None)
+    if first_website is None:
+        print("No websites to analyze. Please check the domains file.")
+        return
+    websites = itertools.chain([first_website], websites)
+
+    # Results are appended to a JSONL log and compacted into the JSON array at the end
+    if not os.path.exists(RESULTS_LOG) and os.path.exists(RESULTS_FILE):
+        print(f"Migrating {RESULTS_FILE} to {RESULTS_LOG}")
+        import_json(RESULTS_FILE, RESULTS_LOG)
+
+    # Skip domains whose cached result is still fresh; the cache only records
+    # results once the sink has made them durable
+    cache = DomainCache(CACHE_FILE)
+    websites = cache.stale_domains(websites)
+    # Every result also goes to the SQLite store, one scan row per run, and is
+    # diffed against the last snapshot so only changes reach the change feed
+    snapshots = SnapshotRecorder(SNAPSHOT_FILE, CHANGES_LOG, source=RESULTS_LOG)
+    sink = FanoutSink(
+        ResultSink(RESULTS_LOG, on_flush=cache.record_many),
+        ResultStore(STORE_FILE, source=RESULTS_LOG),
+        snapshots,
+    )
+
+    if not os.path.exists("domains_without_suggestions.txt"):
+        print("Creating domains_without_suggestions.txt")
+        with open("domains_without_suggestions.txt", "w", encoding="utf-8") as file:
+            pass  # Create an empty file
+
+    if DETECTION_BACKEND == "fingerprint":
+        # No browser and no sign-in: fetch each site and match it against local signatures
+        engine = FingerprintEngine(SIGNATURES_FILE, concurrency=FINGERPRINT_CONCURRENCY, retry=RETRY)
+        try:
+            await engine.run(websites, sink)
+        finally:
+            engine.close()
+    else:
+        await analyze_with_accounts(credentials_list, websites, sink)
+
+    # Flush the tail of the log and rebuild the legacy JSON array from it
+    sink.close()
+    print(f"Skipped {cache.skipped} domains with a fresh cached result")
+    print(f"{snapshots.changed} domains changed since the last snapshot, {snapshots.unchanged} unchanged")
+    cache.close()
+    count = export_json(RESULTS_LOG, RESULTS_FILE)
+    print(f"Exported {count} results to {RESULTS_FILE}")
+    export_metrics()
+    PARSER.close()
+
+# Run the main function; guarded so parser worker processes can import this module
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+import argparse
+import bisect
+import datetime
+import json
+import re
+import sys
+from collections import Counter
+from result_sink import ResultSink, iter_results
+
+DATASET_FILE = "component_dataset.json"
+VERSION_PARTS = 4
+
+# Worst status wins when several apply
+STATUS_ORDER = ["unknown", "current", "outdated", "eol", "vulnerable"]
+
+
+def parse_version(version):
+    # "3.5.1-rc1" -> (3, 5, 1, 0); None when there is no leading number
+    if version is None:
+        return None
+    numbers = re.findall(r"\d+", str(version).split("-")[0].split("+")[0])
+    if not numbers:
+        return None
+    parts = tuple(int(n) for n in numbers[:VERSION_PARTS])
+    return parts + (0,) * (VERSION_PARTS - len(parts))
+
+
+def product_key(name):
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+class ProductIndex:
+    # Advisory ranges flattened into sorted boundaries; segment i covers versions
+    # in [boundaries[i - 1], boundaries[i]) and lists the advisories active there
+    def __init__(self, entry):
+        self.latest = parse_version(entry.get("latest"))
+        self.cycles = {}
+        for cycle in entry.get("cycles", []):
+            prefix = parse_version(cycle["cycle"])[:len(cycle["cycle"].split("."))]
+            self.cycles[prefix] = cycle.get("eol")
+        self.cycle_lengths = sorted({len(prefix) for prefix in self.cycles}, reverse=True)
+
+        ranges = []
+        for advisory in entry.get("vulnerable", []):
+            start = parse_version(advisory.get("introduced") or "0")
+            end = parse_version(advisory["fixed"]) if advisory.get("fixed") else None
+            ranges.append((start, end, advisory["id"]))
+        self.boundaries = sorted({start for start, _, _ in ranges} | {end for _, end, _ in ranges if end})
+        self.segments = []
+        for i in range(len(self.boundaries) + 1):
+            low = self.boundaries[i - 1] if i else None
+            ids = []
+            if low is not None:
+                for start, end, advisory_id in ranges:
+                    if start <= low and (end is None or low < end) and advisory_id not in ids:
+                        ids.append(advisory_id)
+            self.segments.append(ids)
+
+    def advisories(self, version):
+        return self.segments[bisect.bisect_right(self.boundaries, version)]
+
+    def eol(self, version):
+        for length in self.cycle_lengths:
+            if version[:length] in self.cycles:
+                return self.cycles[version[:length]]
+        return None
+
+
+class OutdatedEngine:
+    # Classifies (product, version) pairs as current, outdated, eol or vulnerable.
+    # Each distinct pair is resolved once, so repeated components cost a dict lookup.
+    def __init__(self, dataset, as_of=None):
+        self.products = {product_key(name): ProductIndex(entry) for name, entry in dataset["products"].items()}
+        self.as_of = (as_of or datetime.date.today()).isoformat()
+        self.memo = {}
+
+    @classmethod
+    def load(cls, file_path=DATASET_FILE, as_of=None):
+        with open(file_path, "r", encoding="utf-8") as file:
+            return cls(json.load(file), as_of)
+
+    def classify(self, name, version):
+        key = (name, version)
+        if key not in self.memo:
+            self.memo[key] = self.resolve(product_key(name), version)
+        return self.memo[key]
+
+    def resolve(self, product, version):
+        index = self.products.get(product)
+        parsed = parse_version(version)
+        if index is None or parsed is None:
+            return {"status": "unknown", "advisories": [], "eol": None}
+        advisories = index.advisories(parsed)
+        eol = index.eol(parsed)
+        if advisories:
+            status = "vulnerable"
+        elif eol and eol <= self.as_of:
+            status = "eol"
+        elif index.latest and parsed < index.latest:
+            status = "outdated"
+        else:
+            status = "current"
+        return {"status": status, "advisories": list(advisories), "eol": eol}
+
+    def classify_result(self, result):
+        # Annotate each technology record in place and set the domain's worst status
+        worst = "unknown"
+        for technology in result.get("technologies") or []:
+            verdict = self.classify(technology["name"], technology.get("version"))
+            technology.update({"component_status": verdict["status"], "advisories": verdict["advisories"], "eol": verdict["eol"]})
+            if STATUS_ORDER.index(verdict["status"]) > STATUS_ORDER.index(worst):
+                worst = verdict["status"]
+        result["component_status"] = worst
+        return result
+
+    def classify_results(self, results):
+        for result in results:
+            yield self.classify_result(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flag outdated, EOL and vulnerable components in a results log")
+    parser.add_argument("results", help="JSONL results log, e.g. website_analysis_results.jsonl")
+    parser.add_argument("output", help="JSONL file to write the classified results to")
+    parser.add_argument("--dataset", default=DATASET_FILE, help="local EOL/advisory dataset")
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, help="date to judge EOL against (default: today)")
+    args = parser.parse_args(argv)
+
+    engine = OutdatedEngine.load(args.dataset, args.as_of)
+    counts = Counter()
+    open(args.output, "w").close()
+    with ResultSink(args.output, batch_size=1000) as sink:
+        for result in engine.classify_results(iter_results(args.results)):
+            counts[result["component_status"]] += 1
+            sink.write(result)
+    for status in reversed(STATUS_ORDER):
+        print(f"{status}: {counts[status]} domains")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import asyncio
+from metrics import METRICS
+
+HEAP_SCRIPT = "() => performance.memory ? performance.memory.usedJSHeapSize : null"
+
+
+class PageRecycler:
+    # Hands one worker its page and swaps it for a pre-warmed spare after
+    # max_domains lookups, or once the renderer's JS heap passes max_heap_mb.
+    # A page that crashed or was closed is replaced after its domain whatever the limits.
+    # Pages come from open_page(), so they stay on the same signed-in context.
+    def __init__(self, open_page, max_domains=None, max_heap_mb=None, check_every=10):
+        self.open_page = open_page
+        self.max_domains = max_domains
+        self.max_heap_bytes = max_heap_mb * 1024 * 1024 if max_heap_mb else None
+        self.check_every = check_every
+        self.page = None
+        self.spare = None
+        self.domains = 0
+        self.crashed = set()
+
+    @property
+    def recycling(self):
+        return bool(self.max_domains or self.max_heap_bytes)
+
+    async def start(self):
+        self.page = await self.open_watched()
+        self.warm_spare()
+        return self.page
+
+    async def open_watched(self):
+        page = await self.open_page()
+        if hasattr(page, "on"):
+            # A renderer crash leaves the page object open but every call on it failing
+            page.on("crash", self.crashed.add)
+        return page
+
+    def warm_spare(self):
+        if self.recycling:
+            self.spare = asyncio.ensure_future(self.open_watched())
+
+    def is_dead(self):
+        is_closed = getattr(self.page, "is_closed", None)
+        return self.page in self.crashed or bool(is_closed and is_closed())
+
+    async def heap_bytes(self):
+        try:
+            return await self.page.evaluate(HEAP_SCRIPT)
+        except Exception as e:
+            print(f"Error reading page memory: {e}")
+            return None
+
+    async def recycle_reason(self):
+        if self.max_domains and self.domains >= self.max_domains:
+            return "domains"
+        if self.max_heap_bytes and self.domains % self.check_every == 0:
+            heap = await self.heap_bytes()
+            if heap is not None:
+                METRICS.set_gauge("browser_js_heap_bytes", heap)
+                if heap >= self.max_heap_bytes:
+                    return "memory"
+        return None
+
+    async def after_domain(self):
+        # Call once per finished domain; returns the page to use next
+        self.domains += 1
+        if self.is_dead():
+            reason = "crashed"
+        elif not self.recycling:
+            return self.page
+        else:
+            reason = await self.recycle_reason()
+            if reason is None:
+                return self.page
+
+        try:
+            replacement = await self.spare if self.spare is not None else await self.open_watched()
+        except Exception as e:
+            print(f"Spare page failed to open, opening a new one: {e}")
+            replacement = await self.open_watched()
+        old_page, self.page = self.page, replacement
+        self.crashed.discard(old_page)
+        self.domains = 0
+        self.warm_spare()
+        METRICS.increment("page_recycles", reason=reason)
+        try:
+            await old_page.close()
+        except Exception as e:
+            print(f"Error closing recycled page: {e}")
+        return self.page
+
+    async def close(self):
+        if self.spare is not None:
+            try:
+                await (await self.spare).close()
+            except Exception as e:
+                print(f"Error closing spare page: {e}")
+        if self.page is not None:
+            await self.page.close()
@@ -0,0 +1,233 @@
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from domain_cache import result_status
+from domain_utils import open_text
+from metrics import write_atomically
+from outdated_engine import DATASET_FILE, STATUS_ORDER, OutdatedEngine, product_key
+
+# Aggregate report over results files of any size: JSON arrays are read with an
+# incremental decoder and JSONL files line by line, so memory holds one record plus
+# the running totals. Files, and byte ranges of large plain JSONL files, are
+# summarized in parallel worker processes and merged.
+
+READ_SIZE = 1 << 20
+SPLIT_BYTES = 64 << 20  # Plain JSONL files are cut into ranges of about this size
+MAX_RECORD_BYTES = 64 << 20  # A JSON array element larger than this is treated as corrupt
+SEPARATORS = re.compile(r"[\s,]*")
+FLAGGED = ("outdated", "eol", "vulnerable")
+technology_key = lru_cache(maxsize=None)(product_key)  # The same few thousand names repeat in every record
+
+
+def iter_json_array(file, read_size=READ_SIZE):
+    # Yield the elements of a JSON array one at a time
+    decoder = json.JSONDecoder()
+    buffer = file.read(read_size)
+    pos = SEPARATORS.match(buffer).end()
+    if buffer[pos:pos + 1] != "[":
+        raise ValueError("Not a JSON array")
+    pos += 1
+    eof = False
+    while True:
+        pos = SEPARATORS.match(buffer, pos).end()
+        if pos < len(buffer):
+            if buffer[pos] == "]":
+                return
+            try:
+                value, pos = decoder.raw_decode(buffer, pos)
+                yield value
+                continue
+            except json.JSONDecodeError:
+                # Most likely an element cut off by the end of the buffer; read on
+                if eof or len(buffer) - pos > MAX_RECORD_BYTES:
+                    raise
+        elif eof:
+            raise ValueError("Unterminated JSON array")
+        chunk = file.read(read_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def iter_jsonl_range(file_path, start, end):
+    # Records of the lines that start inside [start, end) of a plain JSONL file
+    with open(file_path, "rb") as file:
+        if start:
+            file.seek(start - 1)
+            file.readline()  # Skip the line straddling start; the previous range owns it
+        position = file.tell()
+        while position < end:
+            line = file.readline()
+            if not line:
+                return
+            position += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                print(f"Skipping unreadable result line in {file_path}: {e}")
+
+
+def iter_file(file_path):
+    # JSON array or JSONL, plain or gzip, told apart by the first character
+    with open_text(file_path) as file:
+        first = file.read(1)
+        while first.isspace():
+            first = file.read(1)
+    with open_text(file_path) as file:
+        if first == "[":
+            yield from iter_json_array(file)
+            return
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                print(f"Skipping unreadable result line in {file_path}: {e}")
+
+
+def plan_tasks(paths, split_bytes=SPLIT_BYTES):
+    # One task per file, except plain JSONL files, which are split into byte ranges
+    tasks = []
+    for path in paths:
+        with open(path, "rb") as file:
+            head = file.read(READ_SIZE)
+        splittable = not head.startswith(b"\x1f\x8b") and not head.lstrip().startswith(b"[")
+        size = os.path.getsize(path)
+        if splittable and size > split_bytes:
+            tasks.extend((path, start, min(size, start + split_bytes)) for start in range(0, size, split_bytes))
+        else:
+            tasks.append((path, None, None))
+    return tasks
+
+
+class Report:
+    # Running totals: outcomes, worst component status per domain, and per technology
+    # the number of domains, the version distribution and the classification counts
+    def __init__(self):
+        self.records = 0
+        self.statuses = Counter()
+        self.domain_statuses = Counter()
+        self.technologies = {}
+
+    def add(self, result, engine):
+        self.records += 1
+        status = result_status(result)
+        self.statuses[status] += 1
+        if status != "success":
+            return
+        worst = "unknown"
+        for technology in result.get("technologies") or []:
+            key = technology_key(technology["name"])
+            entry = self.technologies.get(key)
+            if entry is None:
+                entry = self.technologies[key] = {"name": technology["name"], "domains": 0, "versions": Counter(), "component_status": Counter()}
+            version = technology.get("version")
+            verdict = engine.classify(technology["name"], version)["status"]
+            entry["domains"] += 1
+            entry["versions"][version or "unknown"] += 1
+            entry["component_status"][verdict] += 1
+            if STATUS_ORDER.index(verdict) > STATUS_ORDER.index(worst):
+                worst = verdict
+        self.domain_statuses[worst] += 1
+
+    def merge(self, other):
+        self.records += other.records
+        self.statuses.update(other.statuses)
+        self.domain_statuses.update(other.domain_statuses)
+        for key, theirs in other.technologies.items():
+            entry = self.technologies.get(key)
+            if entry is None:
+                self.technologies[key] = theirs
+                continue
+            entry["domains"] += theirs["domains"]
+            entry["versions"].update(theirs["versions"])
+            entry["component_status"].update(theirs["component_status"])
+
+    def summary(self, top_versions=10):
+        technologies = []
+        for entry in sorted(self.technologies.values(), key=lambda entry: (-entry["domains"], entry["name"])):
+            known = entry["domains"] - entry["component_status"]["unknown"]
+            flagged = sum(entry["component_status"][status] for status in FLAGGED)
+            technologies.append({
+                "name": entry["name"],
+                "domains": entry["domains"],
+                "outdated_rate": round(flagged / known, 4) if known else None,
+                "component_status": dict(entry["component_status"]),
+                "distinct_versions": len(entry["versions"]),
+                "versions": dict(entry["versions"].most_common(top_versions)),
+            })
+        return {
+            "records": self.records,
+            "statuses": dict(self.statuses),
+            "domain_component_status": {status: self.domain_statuses[status] for status in reversed(STATUS_ORDER)},
+            "technologies": technologies,
+        }
+
+
+WORKER_ENGINE = None
+
+
+def load_worker_engine(dataset, as_of):
+    global WORKER_ENGINE
+    WORKER_ENGINE = OutdatedEngine.load(dataset, as_of)
+
+
+def summarize(task):
+    path, start, end = task
+    records = iter_file(path) if start is None else iter_jsonl_range(path, start, end)
+    report = Report()
+    for result in records:
+        report.add(result, WORKER_ENGINE)
+    return report
+
+
+def build_report(paths, dataset=DATASET_FILE, as_of=None, workers=None, split_bytes=SPLIT_BYTES):
+    tasks = plan_tasks(paths, split_bytes)
+    report = Report()
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_worker_engine, initargs=(dataset, as_of)) as executor:
+        for future in as_completed([executor.submit(summarize, task) for task in tasks]):
+            report.merge(future.result())
+    return report
+
+
+def print_summary(summary, top):
+    print(f"{summary['records']} records: " + ", ".join(f"{status} {count}" for status, count in sorted(summary["statuses"].items())))
+    print("Domains by worst component: " + ", ".join(f"{status} {count}" for status, count in summary["domain_component_status"].items()))
+    print()
+    print(f"{'Technology':<32}{'Domains':>10}{'Outdated':>10}  Top versions")
+    for technology in summary["technologies"][:top]:
+        rate = technology["outdated_rate"]
+        versions = ", ".join(f"{version} ({count})" for version, count in list(technology["versions"].items())[:3])
+        print(f"{technology['name'][:31]:<32}{technology['domains']:>10}{'-' if rate is None else f'{rate:.1%}':>10}  {versions}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate technology, version and outdated-component statistics over results files")
+    parser.add_argument("results", nargs="+", help="JSON array or JSONL results files, plain or gzip")
+    parser.add_argument("--dataset", default=DATASET_FILE, help="local EOL/advisory dataset")
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, help="date to judge EOL against (default: today)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--top", type=int, default=25, help="technologies to print")
+    parser.add_argument("--json", help="also write the full report to this file")
+    args = parser.parse_args(argv)
+
+    report = build_report(args.results, args.dataset, args.as_of, args.workers)
+    summary = report.summary()
+    print_summary(summary, args.top)
+    if args.json:
+        write_atomically(args.json, json.dumps(summary, indent=4) + "\n")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
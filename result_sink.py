@@ -0,0 +1,111 @@
+import json
+import os
+import textwrap
+
+
+class ResultSink:
+    # Append-only JSONL writer: one result per line, buffered and fsynced in batches.
+    # A crash can only lose the unflushed tail, never the records already on disk.
+    # on_flush(results) is called after each fsync with the records just made durable.
+    def __init__(self, file_path, batch_size=50, on_flush=None):
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self.buffer = []
+        self.pending = []
+        self.file = open(file_path, "a", encoding="utf-8")
+
+    def write(self, result):
+        self.buffer.append(json.dumps(result, ensure_ascii=False))
+        if self.on_flush:
+            self.pending.append(result)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        self.file.write("\n".join(self.buffer) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.buffer = []
+        if self.on_flush:
+            results, self.pending = self.pending, []
+            self.on_flush(results)
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class FanoutSink:
+    # Passes every result on to several sinks, e.g. the JSONL log and the SQLite store
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def write(self, result):
+        for sink in self.sinks:
+            sink.write(result)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_results(file_path):
+    # Stream records back from a JSONL results file, skipping a torn last line
+    with open(file_path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping unreadable result line in {file_path}: {e}")
+
+
+def export_json(jsonl_path, json_path):
+    # Compact the JSONL log into the legacy JSON array, written to a temp file and
+    # swapped in atomically so a crash never leaves a half-written array behind
+    temp_path = json_path + ".tmp"
+    count = 0
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write("[")
+        for result in iter_results(jsonl_path):
+            file.write(",\n" if count else "\n")
+            file.write(textwrap.indent(json.dumps(result, indent=4, ensure_ascii=False), "    "))
+            count += 1
+        file.write("\n]\n" if count else "]\n")
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, json_path)
+    return count
+
+
+def import_json(json_path, jsonl_path):
+    # One-off migration of a legacy JSON array into the JSONL log
+    with open(json_path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    with ResultSink(jsonl_path, batch_size=1000) as sink:
+        for result in data:
+            sink.write(result)
+    return len(data)
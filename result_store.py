@@ -0,0 +1,199 @@
+import argparse
+import sqlite3
+import sys
+import time
+from domain_cache import result_status
+from outdated_engine import parse_version, product_key
+from result_sink import iter_results
+
+STORE_FILE = "website_analysis_results.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS domains (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    last_scan_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS domain_results (
+    scan_id INTEGER NOT NULL,
+    domain_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    scanned_at REAL NOT NULL,
+    PRIMARY KEY (scan_id, domain_id)
+);
+CREATE TABLE IF NOT EXISTS technologies (
+    scan_id INTEGER NOT NULL,
+    domain_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    category TEXT,
+    version TEXT,
+    version_key TEXT,
+    confidence INTEGER
+);
+CREATE INDEX IF NOT EXISTS technologies_by_version ON technologies (name_key, version_key);
+CREATE INDEX IF NOT EXISTS technologies_by_domain ON technologies (domain_id, scan_id);
+"""
+
+
+def version_key(version):
+    # Zero-padded so SQLite's text ordering matches version ordering: 3.10 > 3.5
+    parsed = parse_version(version)
+    if parsed is None:
+        return None
+    return ".".join(f"{part:08d}" for part in parsed)
+
+
+class ResultStore:
+    # Normalized SQLite store of scan results. Takes the same write/flush/close
+    # calls as ResultSink and inserts in batched transactions.
+    def __init__(self, file_path=STORE_FILE, source=None, batch_size=500):
+        self.batch_size = batch_size
+        self.source = source
+        self.buffer = []
+        self.scan_id = None
+        self.connection = sqlite3.connect(file_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def write(self, result):
+        self.buffer.append(result)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def start_scan(self):
+        cursor = self.connection.execute("INSERT INTO scans (started_at, source) VALUES (?, ?)", (time.time(), self.source))
+        self.scan_id = cursor.lastrowid
+        return self.scan_id
+
+    def domain_ids(self, names):
+        self.connection.executemany("INSERT OR IGNORE INTO domains (name) VALUES (?)", [(name,) for name in names])
+        ids = {}
+        names = list(names)
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            ids.update(self.connection.execute(f"SELECT name, id FROM domains WHERE name IN ({placeholders})", chunk))
+        return ids
+
+    def flush(self):
+        if not self.buffer:
+            return
+        results, self.buffer = self.buffer, []
+        now = time.time()
+        with self.connection:
+            if self.scan_id is None:
+                self.start_scan()
+            ids = self.domain_ids({result["domain"] for result in results})
+            scan_rows = []
+            technology_rows = []
+            latest = []
+            for result in results:
+                domain_id = ids[result["domain"]]
+                status = result_status(result)
+                scan_rows.append((self.scan_id, domain_id, status, now))
+                # Only a lookup that found technologies replaces what the domain had before;
+                # a failed or empty rescan keeps the previous scan as its latest, as in snapshots
+                if status == "success" and result.get("technologies"):
+                    latest.append((self.scan_id, domain_id))
+                for technology in result.get("technologies") or []:
+                    version = technology.get("version")
+                    technology_rows.append((
+                        self.scan_id,
+                        domain_id,
+                        technology["name"],
+                        product_key(technology["name"]),
+                        technology.get("category"),
+                        version,
+                        version_key(version),
+                        technology.get("confidence"),
+                    ))
+            # A domain seen twice in one scan keeps only its latest technologies
+            self.connection.executemany("DELETE FROM technologies WHERE scan_id = ? AND domain_id = ?", latest)
+            self.connection.executemany("INSERT OR REPLACE INTO domain_results VALUES (?, ?, ?, ?)", scan_rows)
+            self.connection.executemany("INSERT INTO technologies VALUES (?, ?, ?, ?, ?, ?, ?, ?)", technology_rows)
+            self.connection.executemany("UPDATE domains SET last_scan_id = ? WHERE id = ?", latest)
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def domains_with(self, technology, below=None, at_least=None, limit=None):
+        # Domains whose latest scan detected `technology`, optionally in [at_least, below)
+        query = (
+            "SELECT d.name, t.name, t.version FROM technologies t "
+            "JOIN domains d ON d.id = t.domain_id AND d.last_scan_id = t.scan_id "
+            "WHERE t.name_key = ?"
+        )
+        params = [product_key(technology)]
+        if at_least is not None:
+            query += " AND t.version_key >= ?"
+            params.append(version_key(at_least))
+        if below is not None:
+            query += " AND t.version_key < ?"
+            params.append(version_key(below))
+        query += " ORDER BY d.name"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return self.connection.execute(query, params).fetchall()
+
+    def technologies_of(self, domain):
+        return self.connection.execute(
+            "SELECT t.name, t.category, t.version, t.confidence FROM technologies t "
+            "JOIN domains d ON d.id = t.domain_id AND d.last_scan_id = t.scan_id "
+            "WHERE d.name = ? ORDER BY t.name",
+            (domain,),
+        ).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load and query the SQLite result store")
+    parser.add_argument("--db", default=STORE_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("import", help="load a JSONL results log as a new scan")
+    load.add_argument("results")
+
+    query = commands.add_parser("query", help="domains running a technology, e.g. query jquery --below 3.5")
+    query.add_argument("technology")
+    query.add_argument("--below", help="only versions lower than this")
+    query.add_argument("--at-least", help="only versions at or above this")
+    query.add_argument("--limit", type=int)
+
+    show = commands.add_parser("domain", help="technologies detected on one domain")
+    show.add_argument("domain")
+    args = parser.parse_args(argv)
+
+    with ResultStore(args.db, source=getattr(args, "results", None)) as store:
+        if args.command == "import":
+            count = 0
+            for result in iter_results(args.results):
+                store.write(result)
+                count += 1
+            print(f"Imported {count} results into {args.db}")
+        elif args.command == "query":
+            start = time.perf_counter()
+            rows = store.domains_with(args.technology, args.below, args.at_least, args.limit)
+            for domain, name, version in rows:
+                print(f"{domain}\t{name}\t{version or ''}")
+            print(f"{len(rows)} domains in {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+        else:
+            for name, category, version, confidence in store.technologies_of(args.domain):
+                print(f"{name}\t{category or ''}\t{version or ''}\t{confidence}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
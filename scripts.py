@@ -0,0 +1,18 @@
+import importlib.util
+import os
+
+# The two scraper scripts, importable by name for the benchmark and the sharded runner
+# ("Outdated Components.py" has a space in its file name, so plain import cannot load it)
+
+SCRIPTS = {
+    "outdated_components": "outdated_components.py",
+    "legacy": "Outdated Components.py",
+}
+
+
+def load_script(name):
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), SCRIPTS[name])
+    spec = importlib.util.spec_from_file_location(f"script_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
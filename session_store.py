@@ -0,0 +1,64 @@
+import hashlib
+import json
+import os
+
+SESSION_DIR = "sessions"
+
+
+def session_path(email, directory=SESSION_DIR):
+    # File names are hashed so the directory listing does not leak account emails
+    digest = hashlib.sha256(email.strip().lower().encode("utf-8")).hexdigest()[:24]
+    return os.path.join(directory, f"{digest}.json")
+
+
+async def save_session(context, email, directory=SESSION_DIR):
+    # Cookies are credentials: owner-only directory and file, replaced atomically
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    os.chmod(directory, 0o700)
+    state = await context.storage_state()
+    path = session_path(email, directory)
+    temp_path = path + ".tmp"
+    descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+        json.dump(state, file)
+    os.chmod(temp_path, 0o600)
+    os.replace(temp_path, path)
+
+
+def forget_session(email, directory=SESSION_DIR):
+    try:
+        os.remove(session_path(email, directory))
+    except FileNotFoundError:
+        pass
+
+
+async def open_session(browser, email, password, login, probe, setup_page=None, directory=SESSION_DIR):
+    # Returns (context, page, reused). A saved storage_state is tried first and kept
+    # if probe(page) says it is still signed in; otherwise login(page, email, password)
+    # runs on a fresh context and its state is saved for the next run.
+    path = session_path(email, directory)
+    if os.path.exists(path):
+        context = await browser.new_context(storage_state=path)
+        try:
+            page = await context.new_page()
+            if setup_page:
+                await setup_page(page)
+            if await probe(page):
+                return context, page, True
+            print(f"Saved session for {email} has expired, signing in again")
+        except Exception as e:
+            print(f"Error restoring saved session for {email}: {e}")
+        await context.close()
+        forget_session(email, directory)
+
+    context = await browser.new_context()
+    try:
+        page = await context.new_page()
+        if setup_page:
+            await setup_page(page)
+        await login(page, email, password)
+        await save_session(context, email, directory)
+    except Exception:
+        await context.close()
+        raise
+    return context, page, False
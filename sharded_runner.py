@@ -0,0 +1,354 @@
+import argparse
+import asyncio
+import glob
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+from playwright.async_api import async_playwright
+from domain_cache import DomainCache
+from result_sink import FanoutSink, ResultSink, export_json, iter_results
+from result_store import ResultStore
+from scripts import SCRIPTS, load_script
+from session_store import SESSION_DIR, open_session
+from snapshots import SnapshotRecorder
+from stack_parser import StackParserPool
+
+# Runs one of the scripts in K processes, each with its own browser and signed-in
+# session, pulling domains from a shared SQLite queue. Each process writes its own
+# JSONL shard; `merge` folds the shards into the script's usual log, cache and stores.
+
+QUEUE_FILE = "work_queue.sqlite3"
+SHARD_DIR = "shards"
+
+
+class WorkQueue:
+    # Domains shared by the shard processes. A worker leases a batch; the lease
+    # expires after lease_seconds unless renewed or completed, so the domains of a
+    # worker that crashed go back to the others. Domains that keep taking workers
+    # down are dropped after max_attempts leases.
+    def __init__(self, file_path=QUEUE_FILE, lease_seconds=600, max_attempts=5):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.connection = sqlite3.connect(file_path, timeout=60, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS work ("
+            "domain TEXT PRIMARY KEY, state TEXT NOT NULL DEFAULT 'pending', worker INTEGER, "
+            "lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS work_by_state ON work (state, lease_expires)")
+
+    def reset(self):
+        self.connection.execute("DELETE FROM work")
+
+    def load(self, domains, batch_size=1000):
+        added = 0
+        batch = []
+        for domain in domains:
+            batch.append((domain,))
+            if len(batch) >= batch_size:
+                added += self.insert(batch)
+                batch = []
+        if batch:
+            added += self.insert(batch)
+        return added
+
+    def insert(self, rows):
+        self.connection.execute("BEGIN IMMEDIATE")
+        before = self.connection.total_changes
+        self.connection.executemany("INSERT OR IGNORE INTO work (domain) VALUES (?)", rows)
+        self.connection.execute("COMMIT")
+        return self.connection.total_changes - before
+
+    def lease(self, worker, count):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never lease the same rows
+        now = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.execute(
+                "UPDATE work SET lease_expires = ? WHERE worker = ? AND state = 'leased'",
+                (now + self.lease_seconds, worker),
+            )
+            domains = [row[0] for row in self.connection.execute(
+                "SELECT domain FROM work WHERE (state = 'pending' OR (state = 'leased' AND lease_expires < ?)) "
+                "AND attempts < ? LIMIT ?",
+                (now, self.max_attempts, count),
+            )]
+            self.connection.executemany(
+                "UPDATE work SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE domain = ?",
+                [(worker, now + self.lease_seconds, domain) for domain in domains],
+            )
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        return domains
+
+    def release(self, worker):
+        # A restarted worker reuses its id; hand back what its previous process held,
+        # or lease() would keep renewing those rows without anyone processing them
+        self.connection.execute("BEGIN IMMEDIATE")
+        cursor = self.connection.execute(
+            "UPDATE work SET state = 'pending', worker = NULL, lease_expires = NULL WHERE worker = ? AND state = 'leased'",
+            (worker,),
+        )
+        self.connection.execute("COMMIT")
+        return cursor.rowcount
+
+    def complete(self, domains):
+        self.connection.execute("BEGIN IMMEDIATE")
+        self.connection.executemany("UPDATE work SET state = 'done', lease_expires = NULL WHERE domain = ?", [(domain,) for domain in domains])
+        self.connection.execute("COMMIT")
+
+    def leased_elsewhere(self, worker):
+        # Live leases held by other workers that this one may have to pick up if they expire
+        row = self.connection.execute(
+            "SELECT COUNT(*) FROM work WHERE state = 'leased' AND worker != ? AND attempts < ?",
+            (worker, self.max_attempts),
+        ).fetchone()
+        return row[0]
+
+    def counts(self):
+        return dict(self.connection.execute("SELECT state, COUNT(*) FROM work GROUP BY state"))
+
+    def close(self):
+        self.connection.close()
+
+
+class SharedRateLimiter:
+    # worker_pool.RateLimiter across processes: the next free slot lives in a
+    # multiprocessing Value and is reserved under its lock
+    def __init__(self, requests_per_second, next_slot):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_slot = next_slot
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        with self.next_slot.get_lock():
+            now = time.monotonic()
+            slot = max(now, self.next_slot.value)
+            self.next_slot.value = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def shard_path(shard_dir, worker_id):
+    return os.path.join(shard_dir, f"worker-{worker_id}.jsonl")
+
+
+async def leased_domains(queue, worker_id, batch_size, poll_seconds, flush=None):
+    # flush() makes this worker's finished results durable, completing their domains.
+    # It runs before every poll: a finished tail left in the sink's buffer would stay
+    # leased, renewed by each lease() call, and keep the other workers polling for it.
+    while True:
+        domains = queue.lease(worker_id, batch_size)
+        if domains:
+            for domain in domains:
+                yield domain
+            continue
+        if flush:
+            flush()
+        if not queue.leased_elsewhere(worker_id):
+            return
+        # Another worker still holds leases; stay around in case it dies and they expire
+        await asyncio.sleep(poll_seconds)
+
+
+async def shard_main(script, worker_id, account, options, next_slot):
+    module = load_script(script)
+    # The script's own parser pool is sized for the whole machine; the workers share it.
+    # Its processes only start on the first parse, so replacing it costs nothing.
+    module.PARSER.close()
+    module.PARSER = StackParserPool(max(1, (os.cpu_count() or 1) // options["workers"]))
+    module.CONCURRENCY = options["pages"]
+    module.RATE_LIMITER = SharedRateLimiter(options["requests_per_second"], next_slot)
+    module.METRICS_JSON = os.path.join(options["shard_dir"], f"metrics-{worker_id}.json")
+    module.METRICS_PROM = os.path.join(options["shard_dir"], f"metrics-{worker_id}.prom")
+
+    queue = WorkQueue(options["queue"], options["lease_seconds"])
+    released = queue.release(worker_id)
+    if released:
+        print(f"Worker {worker_id} released {released} domains left leased by its previous process")
+    # A domain only counts as done once its result is fsynced to this worker's shard
+    sink = ResultSink(
+        shard_path(options["shard_dir"], worker_id),
+        on_flush=lambda results: queue.complete([result["domain"] for result in results]),
+    )
+    email, password = account
+    try:
+        async with async_playwright() as p:
+            browser = await module.PROFILE.launch(p)
+            # Each worker keeps its own saved session, so workers sharing an account never
+            # write the same session file
+            context, page, reused = await open_session(
+                browser, email, password, module.login, module.is_signed_in, module.PROFILE.attach,
+                directory=os.path.join(SESSION_DIR, f"shard-{worker_id}"),
+            )
+            print(f"Worker {worker_id} signed in as {email}" + (" (saved session)" if reused else ""))
+            try:
+                domains = leased_domains(queue, worker_id, options["lease_batch"], options["poll_seconds"], sink.flush)
+                await module.analyze_websites(context, domains, sink)
+            finally:
+                await context.close()
+            await browser.close()
+    finally:
+        sink.close()
+        queue.close()
+        module.export_metrics()
+        module.PARSER.close()
+
+
+def run_shard(script, worker_id, account, options, next_slot):
+    asyncio.run(shard_main(script, worker_id, account, options, next_slot))
+
+
+def fill_queue(module, queue, domains_file):
+    # Same normalization, dedupe and freshness filter as a single-process run
+    cache = DomainCache(module.CACHE_FILE)
+    added = queue.load(cache.stale_domains(module.read_domains(domains_file)))
+    print(f"Queued {added} domains, skipped {cache.skipped} with a fresh cached result")
+    cache.close()
+    return added
+
+
+def merge(module, shard_dir=SHARD_DIR):
+    # Fold the worker shards into the script's results log, cache, store and snapshots.
+    # Shards are deleted only after the merged log is durable, so a crash mid-merge
+    # at worst merges a shard twice, which the cache and snapshots absorb.
+    paths = sorted(glob.glob(os.path.join(shard_dir, "worker-*.jsonl")))
+    cache = DomainCache(module.CACHE_FILE)
+    snapshots = SnapshotRecorder(module.SNAPSHOT_FILE, module.CHANGES_LOG, source=module.RESULTS_LOG)
+    sink = FanoutSink(
+        ResultSink(module.RESULTS_LOG, batch_size=1000, on_flush=cache.record_many),
+        ResultStore(module.STORE_FILE, source=module.RESULTS_LOG),
+        snapshots,
+    )
+    merged = 0
+    for path in paths:
+        for result in iter_results(path):
+            sink.write(result)
+            merged += 1
+    sink.close()
+    cache.close()
+    for path in paths:
+        os.remove(path)
+    print(f"Merged {merged} results from {len(paths)} shards into {module.RESULTS_LOG}")
+    print(f"{snapshots.changed} domains changed since the last snapshot, {snapshots.unchanged} unchanged")
+    count = export_json(module.RESULTS_LOG, module.RESULTS_FILE)
+    print(f"Exported {count} results to {module.RESULTS_FILE}")
+    module.PARSER.close()
+    return merged
+
+
+def run(args):
+    module = load_script(args.script)
+    accounts = module.read_credentials(args.credentials)
+    if not accounts:
+        print("Failed to load credentials. Please check the credentials file.")
+        module.PARSER.close()
+        return 1
+
+    os.makedirs(args.shard_dir, exist_ok=True)
+    queue = WorkQueue(args.queue, args.lease_seconds)
+    if not args.resume:
+        queue.reset()
+        fill_queue(module, queue, args.domains)
+    queue.close()
+
+    options = {
+        "workers": args.workers,
+        "pages": args.pages,
+        "requests_per_second": args.rps,
+        "shard_dir": args.shard_dir,
+        "queue": args.queue,
+        "lease_seconds": args.lease_seconds,
+        "lease_batch": args.lease_batch,
+        "poll_seconds": args.poll_seconds,
+    }
+    spawn = multiprocessing.get_context("spawn")
+    next_slot = spawn.Value("d", 0.0)  # Global rate ceiling shared by every worker
+
+    def start(worker_id):
+        account = accounts[worker_id % len(accounts)]
+        process = spawn.Process(target=run_shard, args=(args.script, worker_id, account, options, next_slot))
+        process.start()
+        return process
+
+    workers = {worker_id: start(worker_id) for worker_id in range(args.workers)}
+    restarts = 0
+    while workers:
+        for worker_id, process in list(workers.items()):
+            process.join(timeout=1)
+            if process.is_alive():
+                continue
+            del workers[worker_id]
+            if process.exitcode == 0:
+                continue
+            queue = WorkQueue(args.queue, args.lease_seconds)
+            counts = queue.counts()
+            remaining = counts.get("pending", 0) + counts.get("leased", 0)
+            queue.close()
+            if remaining and restarts < args.max_restarts:
+                # Its leases expire on their own; a replacement keeps the worker count up
+                restarts += 1
+                print(f"Worker {worker_id} exited with {process.exitcode}, restarting it")
+                workers[worker_id] = start(worker_id)
+            else:
+                print(f"Worker {worker_id} exited with {process.exitcode}")
+
+    queue = WorkQueue(args.queue, args.lease_seconds)
+    counts = queue.counts()
+    queue.close()
+    print(f"Queue: {counts}")
+    remaining = counts.get("pending", 0) + counts.get("leased", 0)
+    if remaining:
+        print(f"Warning: {remaining} domains were not processed; run --resume retries those "
+              f"that have not yet reached the attempt limit")
+    merge(module, args.shard_dir)
+    return 0
+
+
+def status(args):
+    queue = WorkQueue(args.queue)
+    for state, count in sorted(queue.counts().items()):
+        print(f"{state}\t{count}")
+    queue.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the scraper in several processes over a shared work queue")
+    parser.add_argument("--script", choices=sorted(SCRIPTS), default="outdated_components")
+    parser.add_argument("--queue", default=QUEUE_FILE)
+    parser.add_argument("--shard-dir", default=SHARD_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    start = commands.add_parser("run", help="queue the domains, run the workers, then merge their shards")
+    start.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="processes, one browser each")
+    start.add_argument("--pages", type=int, default=4, help="pages per worker browser")
+    start.add_argument("--rps", type=float, default=1.0, help="requests-per-second ceiling across all workers")
+    start.add_argument("--domains", default="domains.txt")
+    start.add_argument("--credentials", default="credentials.txt")
+    start.add_argument("--resume", action="store_true", help="keep the existing queue instead of refilling it")
+    start.add_argument("--lease-seconds", type=float, default=600)
+    start.add_argument("--lease-batch", type=int, default=20)
+    start.add_argument("--poll-seconds", type=float, default=15)
+    start.add_argument("--max-restarts", type=int, default=3)
+
+    commands.add_parser("merge", help="fold leftover worker shards into the results")
+    commands.add_parser("status", help="count queued domains by state")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        return run(args)
+    if args.command == "merge":
+        merge(load_script(args.script), args.shard_dir)
+        return 0
+    return status(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from domain_cache import result_status
+from outdated_engine import product_key
+from result_sink import ResultSink, iter_results
+
+SNAPSHOT_FILE = "snapshots.sqlite3"
+CHANGES_LOG = "technology_changes.jsonl"
+
+# Each distinct component set is stored once under its content hash. A domain's
+# current state is a pointer to one of those hashes, and history only gains a row
+# when that pointer moves, so storage grows with change rather than domains x runs.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS contents (
+    hash TEXT PRIMARY KEY,
+    components TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS domain_state (
+    domain TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    checked_snapshot_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    snapshot_id INTEGER NOT NULL,
+    domain TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (domain, snapshot_id)
+);
+"""
+
+
+def components_of(result):
+    # Canonical component set of a result: one version per product, sorted
+    components = {}
+    for technology in result.get("technologies") or []:
+        key = product_key(technology["name"])
+        if key:
+            components[key] = [technology["name"], technology.get("version")]
+    return dict(sorted(components.items()))
+
+
+def content_hash(components):
+    text = json.dumps(components, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest(), text
+
+
+def diff_components(old, new):
+    added = [{"name": new[key][0], "version": new[key][1]} for key in new if key not in old]
+    removed = [{"name": old[key][0], "version": old[key][1]} for key in old if key not in new]
+    version_changed = [
+        {"name": new[key][0], "from": old[key][1], "to": new[key][1]}
+        for key in new
+        if key in old and old[key][1] != new[key][1]
+    ]
+    return added, removed, version_changed
+
+
+class SnapshotRecorder:
+    # Sink that diffs each successful result against the domain's previous snapshot
+    # and appends only the differences to a JSONL change feed. Failed or empty
+    # lookups leave the previous snapshot in place instead of reading as removals.
+    def __init__(self, file_path=SNAPSHOT_FILE, changes_path=CHANGES_LOG, source=None, batch_size=500):
+        self.batch_size = batch_size
+        self.source = source
+        self.buffer = {}
+        self.snapshot_id = None
+        self.changed = 0
+        self.unchanged = 0
+        self.connection = sqlite3.connect(file_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.feed = ResultSink(changes_path, batch_size=batch_size) if changes_path else None
+
+    def write(self, result):
+        # A results page with nothing on it (no result block) is "success" with no
+        # technologies; that says nothing about what the site runs
+        if result_status(result) != "success" or not result.get("technologies"):
+            return
+        self.buffer[result["domain"]] = components_of(result)  # Last result of a domain wins
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def start_snapshot(self):
+        cursor = self.connection.execute("INSERT INTO snapshots (started_at, source) VALUES (?, ?)", (time.time(), self.source))
+        self.snapshot_id = cursor.lastrowid
+        return self.snapshot_id
+
+    def previous_states(self, domains):
+        states = {}
+        for start in range(0, len(domains), 500):
+            chunk = domains[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.connection.execute(
+                f"SELECT s.domain, s.hash, c.components FROM domain_state s JOIN contents c ON c.hash = s.hash "
+                f"WHERE s.domain IN ({placeholders})",
+                chunk,
+            )
+            for domain, digest, components in rows:
+                states[domain] = (digest, json.loads(components))
+        return states
+
+    def flush(self):
+        if not self.buffer:
+            if self.feed:
+                self.feed.flush()
+            return
+        batch, self.buffer = self.buffer, {}
+        now = time.time()
+        with self.connection:
+            if self.snapshot_id is None:
+                self.start_snapshot()
+            previous = self.previous_states(list(batch))
+            contents = []
+            states = []
+            history = []
+            checked = []
+            changes = []
+            for domain, components in batch.items():
+                digest, text = content_hash(components)
+                old_digest, old_components = previous.get(domain, (None, {}))
+                if digest == old_digest:
+                    checked.append((self.snapshot_id, domain))
+                    self.unchanged += 1
+                    continue
+                contents.append((digest, text))
+                states.append((domain, digest, self.snapshot_id, self.snapshot_id))
+                history.append((self.snapshot_id, domain, digest))
+                added, removed, version_changed = diff_components(old_components, components)
+                changes.append({
+                    "snapshot": self.snapshot_id,
+                    "domain": domain,
+                    "checked_at": round(now, 3),
+                    "new": old_digest is None,
+                    "hash": digest,
+                    "added": added,
+                    "removed": removed,
+                    "version_changed": version_changed,
+                })
+                self.changed += 1
+            self.connection.executemany("INSERT OR IGNORE INTO contents VALUES (?, ?)", contents)
+            self.connection.executemany("INSERT OR REPLACE INTO domain_state VALUES (?, ?, ?, ?)", states)
+            self.connection.executemany("INSERT OR REPLACE INTO history VALUES (?, ?, ?)", history)
+            self.connection.executemany("UPDATE domain_state SET checked_snapshot_id = ? WHERE domain = ?", checked)
+        if self.feed:
+            for change in changes:
+                self.feed.write(change)
+            self.feed.flush()
+
+    def close(self):
+        self.flush()
+        if self.feed:
+            self.feed.close()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def components_at(self, domain, snapshot_id=None):
+        # Component set a domain had as of a snapshot (latest when snapshot_id is None)
+        query = "SELECT c.components FROM history h JOIN contents c ON c.hash = h.hash WHERE h.domain = ?"
+        params = [domain]
+        if snapshot_id is not None:
+            query += " AND h.snapshot_id <= ?"
+            params.append(snapshot_id)
+        row = self.connection.execute(query + " ORDER BY h.snapshot_id DESC LIMIT 1", params).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot results and print what changed between scans")
+    parser.add_argument("--db", default=SNAPSHOT_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("import", help="record a JSONL results log as a new snapshot")
+    load.add_argument("results")
+    load.add_argument("--changes", default=CHANGES_LOG, help="change feed to append to")
+
+    show = commands.add_parser("show", help="a domain's components as of a snapshot")
+    show.add_argument("domain")
+    show.add_argument("--snapshot", type=int)
+
+    feed = commands.add_parser("changes", help="print the change feed, optionally from a snapshot on")
+    feed.add_argument("--changes", default=CHANGES_LOG)
+    feed.add_argument("--since", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "changes":
+        for change in iter_results(args.changes):
+            if change["snapshot"] >= args.since:
+                print(json.dumps(change, ensure_ascii=False))
+        return
+
+    if args.command == "import":
+        with SnapshotRecorder(args.db, args.changes, source=args.results) as recorder:
+            for result in iter_results(args.results):
+                recorder.write(result)
+        print(f"Snapshot {recorder.snapshot_id}: {recorder.changed} domains changed, {recorder.unchanged} unchanged")
+        return
+
+    with SnapshotRecorder(args.db, changes_path=None) as recorder:
+        components = recorder.components_at(args.domain, args.snapshot)
+    if components is None:
+        print(f"No snapshot of {args.domain}")
+        return
+    for name, version in components.values():
+        print(f"{name}\t{version or ''}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import asyncio
+import re
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+# Technology pages are linked as /technologies/<category>/<technology>/
+TECHNOLOGY_HREF = re.compile(r"/technologies/([^/?#]+)/([^/?#]+)")
+NAME_AND_VERSION = re.compile(r"^(.*?)\s+v?(\d+(?:\.\d+)+[\w.+-]*|\d+)$")
+VERSION = re.compile(r"^v?(\d+(?:\.\d+)+[\w.+-]*|\d+)$")
+CONFIDENCE = re.compile(r"(\d{1,3})\s*%")
+HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+SKIPPED = {"script", "style", "svg", "noscript"}
+
+
+class StackTokenizer(HTMLParser):
+    # Flattens the result block into heading, technology-link and text tokens
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tokens = []
+        self.heading = None
+        self.link = None
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED:
+            self.skip_depth += 1
+        elif tag in HEADINGS:
+            self.heading = []
+        elif tag == "a":
+            match = TECHNOLOGY_HREF.search(dict(attrs).get("href") or "")
+            if match:
+                self.link = (match.group(1), match.group(2), [])
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in HEADINGS and self.heading is not None:
+            self.tokens.append(("heading", " ".join(self.heading)))
+            self.heading = None
+        elif tag == "a" and self.link is not None:
+            category_slug, slug, text = self.link
+            self.tokens.append(("technology", category_slug, slug, " ".join(text)))
+            self.link = None
+
+    def handle_data(self, data):
+        text = " ".join(data.split())
+        if not text or self.skip_depth:
+            return
+        if self.link is not None:
+            self.link[2].append(text)
+        elif self.heading is not None:
+            self.heading.append(text)
+        else:
+            self.tokens.append(("text", text))
+
+
+def slug_to_title(slug):
+    return slug.replace("-", " ").strip().capitalize()
+
+
+def same_label(text, slug):
+    return re.sub(r"[^a-z0-9]", "", text.lower()) == re.sub(r"[^a-z0-9]", "", slug.lower())
+
+
+def parse_technology_stack(html):
+    # Turn a captured result block into records of technology name, category,
+    # detected version and confidence (100 unless the page says otherwise)
+    return parse_technology_chunks([html])
+
+
+def parse_technology_chunks(chunks):
+    # parse_technology_stack over HTML that arrives in pieces, e.g. streamed from the blob store
+    tokenizer = StackTokenizer()
+    for chunk in chunks:
+        tokenizer.feed(chunk)
+    tokenizer.close()
+
+    technologies = []
+    category = None
+    current = None
+    for token in tokenizer.tokens:
+        kind = token[0]
+        if kind == "heading":
+            current = None
+            if token[1].lower() != "technology stack":
+                category = token[1]
+        elif kind == "technology":
+            _, category_slug, slug, text = token
+            name, version = text or slug_to_title(slug), None
+            match = NAME_AND_VERSION.match(name)
+            if match:
+                name, version = match.group(1), match.group(2)
+            current = {
+                "name": name,
+                # The link's category slug wins; the heading only supplies nicer casing
+                "category": category if category and same_label(category, category_slug) else slug_to_title(category_slug),
+                "version": version,
+                "confidence": 100,
+            }
+            technologies.append(current)
+        elif current is not None:
+            # Text between a technology link and the next one describes that technology
+            text = token[1]
+            if current["version"] is None and VERSION.match(text):
+                current["version"] = VERSION.match(text).group(1)
+            confidence = CONFIDENCE.search(text)
+            if confidence:
+                current["confidence"] = min(100, int(confidence.group(1)))
+    return technologies
+
+
+def technology_lines(technologies):
+    # Short "Name version" lines for the technology_stack field of a result
+    return [f"{technology['name']} {technology['version'] or ''}".strip() for technology in technologies]
+
+
+class StackParserPool:
+    # Runs parse_technology_stack in worker processes so parsing never blocks the
+    # browser's event loop. Processes are only started on the first parse.
+    def __init__(self, workers=None):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    async def parse(self, html):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, parse_technology_stack, html)
+
+    def close(self):
+        self.executor.shutdown()
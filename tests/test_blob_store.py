@@ -0,0 +1,24 @@
+import json
+from blob_store import BlobStore, migrate
+from result_sink import iter_results
+
+HTML = '<div class="stack">\n<a href="/t/jquery">jQuery</a> <span>3.4.1</span>\n</div>'
+
+
+def test_put_is_content_addressed(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"), codec="gz")
+    digest = store.put(HTML)
+    assert store.put(HTML) == digest
+    assert (store.written, store.deduplicated) == (1, 1)
+    assert store.get(digest) == HTML
+    assert "".join(store.chunks(digest, size=7)) == HTML
+
+
+def test_migrate_moves_inline_html_out_of_records(tmp_path):
+    results = tmp_path / "results.jsonl"
+    results.write_text(json.dumps({"domain": "a.com", "status": "success", "technology_stack": HTML.split("\n")}) + "\n")
+    store = BlobStore(str(tmp_path / "blobs"), codec="gz")
+    assert migrate(store, str(results), str(tmp_path / "migrated.jsonl")) == 1
+    (result,) = iter_results(str(tmp_path / "migrated.jsonl"))
+    assert store.get(result["raw_html"]) == HTML
+    assert not any(line.lstrip().startswith("<") for line in result["technology_stack"])
@@ -0,0 +1,25 @@
+import time
+from domain_cache import DAY, DomainCache, result_status
+
+
+def test_result_status_of_legacy_records():
+    assert result_status({"technology_stack": ["No suggestions available"]}) == "no_suggestions"
+    assert result_status({"technology_stack": ["Error: timeout"]}) == "error"
+    assert result_status({"technology_stack": ["No data found."]}) == "no_data"
+    assert result_status({"technology_stack": ["jQuery 3.4.1"]}) == "success"
+
+
+def test_freshness_by_status(tmp_path):
+    cache = DomainCache(str(tmp_path / "cache.sqlite3"))
+    now = time.time()
+    cache.record_many([
+        {"domain": "found.com", "status": "success", "technologies": [{"name": "jQuery"}]},
+        {"domain": "empty.com", "status": "no_data", "technologies": []},
+        {"domain": "failed.com", "status": "error", "technologies": []},
+    ], now=now)
+    assert cache.is_fresh("www.found.com", now=now + 2 * DAY)
+    assert cache.is_fresh("empty.com", now=now + DAY / 2)
+    assert not cache.is_fresh("empty.com", now=now + 2 * DAY)
+    assert not cache.is_fresh("failed.com", now=now + 1)
+    assert list(cache.stale_domains(["found.com", "failed.com", "new.com"])) == ["failed.com", "new.com"]
+    cache.close()
@@ -0,0 +1,51 @@
+import gc
+import gzip
+import warnings
+from domain_utils import DomainDeduper, iter_domains, normalize_domain, open_text
+
+
+def test_normalize_domain():
+    assert normalize_domain("https://www.JQuery.com/path?q=1") == "jquery.com"
+    assert normalize_domain("  example.org.  ") == "example.org"
+    assert normalize_domain("bücher.de") == "xn--bcher-kva.de"
+    assert normalize_domain("") is None
+    assert normalize_domain("http://") is None
+    assert normalize_domain("1") is None
+    assert normalize_domain("1.5") is None
+    assert normalize_domain("192.168.0.1") is None
+    assert normalize_domain("not a domain") is None
+    assert normalize_domain("localhost") is None
+
+
+def test_deduper_keeps_every_distinct_domain_past_its_capacity():
+    seen = DomainDeduper(initial_capacity=64)
+    domains = [f"site-{i}.com" for i in range(5000)]
+    assert all(seen.add(domain) for domain in domains)
+    assert not any(seen.add(domain) for domain in domains)
+    assert len(seen.filters) > 1
+
+
+def test_iter_domains_reads_gzip_csv(tmp_path):
+    path = tmp_path / "domains.csv.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write("rank,Domain\n1,www.a.com\n2,https://A.com/\n3,http://\n4,b.com\n")
+    assert list(iter_domains(str(path))) == ["a.com", "b.com"]
+
+
+def test_iter_domains_finds_the_domain_column_without_a_header(tmp_path):
+    path = tmp_path / "top.csv"
+    path.write_text("1,google.com\n2,youtube.com\n3,www.google.com\n")
+    assert list(iter_domains(str(path))) == ["google.com", "youtube.com"]
+
+
+def test_open_text_closes_gzip_files(tmp_path):
+    path = tmp_path / "domains.txt.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write("a.com\n")
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        with open_text(str(path)) as file:
+            assert file.read() == "a.com\n"
+        del file
+        gc.collect()
+    assert not [warning for warning in caught if issubclass(warning.category, ResourceWarning)]
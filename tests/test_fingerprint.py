@@ -0,0 +1,95 @@
+import asyncio
+import aiohttp
+from aiohttp import web
+from fingerprint import FingerprintEngine, SignatureSet, fetch_page, required_literal
+
+PADDING = "<p>" + "x" * 1000 + "</p>\n"
+BIG_PAGE = (
+    "<html><head><title>Big</title></head><body>\n"
+    + PADDING * 700
+    + '<script src="https://code.jquery.com/jquery-3.4.1.min.js"></script>\n</body></html>'
+)
+
+
+class ListSink:
+    def __init__(self):
+        self.results = []
+
+    def write(self, result):
+        self.results.append(result)
+
+
+async def serve(html):
+    async def index(request):
+        return web.Response(text=html, content_type="text/html", headers={"Server": "nginx/1.18.0"})
+
+    app = web.Application()
+    app.router.add_get("/", index)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"127.0.0.1:{port}"
+
+
+def fetch(html, max_bytes):
+    async def run():
+        runner, host = await serve(html)
+        try:
+            async with aiohttp.ClientSession() as session:
+                return await fetch_page(session, host, max_bytes)
+        finally:
+            await runner.cleanup()
+    return asyncio.run(run())
+
+
+def test_required_literal():
+    assert required_literal(r"jquery[.-]([\d.]*\d)[^/]*\.js") == "jquery"
+    assert required_literal(r"/wp-(?:content|includes)/") == "/wp-"
+    assert required_literal(r"ab?cde") == "cde"
+    assert required_literal(r"jquery|zepto") == ""
+    assert required_literal(r"\d{1,3}\.js") == ""
+    assert required_literal(r"\x41bc") == ""
+    assert required_literal(r"\u00e9tude\.js") == "tude"
+    assert required_literal(r"lodash{2}xyz") == "lodas"
+
+
+def test_patterns_with_counted_quantifiers_are_checked():
+    signatures = SignatureSet({"Foo": {"scriptSrc": "/[a-z]{10,20}\\.js"}})
+    page = {"url": "https://a.com/", "html": '<script src="https://cdn.a.com/abcdefghijkl.js"></script>'}
+    assert [technology["name"] for technology in signatures.analyze(page)] == ["Foo"]
+
+
+def test_fetch_reads_pages_larger_than_one_chunk():
+    page = fetch(BIG_PAGE, max_bytes=2 * 1024 * 1024)
+    assert len(page["html"]) == len(BIG_PAGE)
+    technologies = SignatureSet.load().analyze(page)
+    found = {technology["name"]: technology["version"] for technology in technologies}
+    assert found["jQuery"] == "3.4.1"
+    assert found["Nginx"] == "1.18.0"
+
+
+def test_fetch_stops_at_max_bytes():
+    page = fetch(BIG_PAGE, max_bytes=200000)
+    assert len(page["html"]) == 200000
+
+
+def test_matcher_failure_still_records_the_domain():
+    class BrokenEngine(FingerprintEngine):
+        async def analyze(self, page):
+            raise RuntimeError("A process in the process pool was terminated abruptly")
+
+    async def run():
+        runner, host = await serve("<html></html>")
+        engine = BrokenEngine(workers=1)
+        sink = ListSink()
+        try:
+            await engine.run([host], sink)
+        finally:
+            engine.close()
+            await runner.cleanup()
+        return sink.results
+
+    results = asyncio.run(run())
+    assert [result["status"] for result in results] == ["error"]
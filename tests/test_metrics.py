@@ -0,0 +1,20 @@
+import json
+from metrics import Histogram, Metrics
+
+
+def test_quantile_is_the_bucket_upper_bound():
+    histogram = Histogram()
+    for seconds in (0.01, 0.2, 0.2, 0.3, 4):
+        histogram.observe(seconds)
+    assert histogram.quantile(0.5) == 0.25
+    assert histogram.quantile(0.95) == 5
+
+
+def test_summary_is_valid_json_past_the_last_bucket():
+    metrics = Metrics()
+    metrics.observe("phase_seconds", 0.1, phase="login_form")
+    for _ in range(3):
+        metrics.observe("phase_seconds", 300, phase="login_form")
+    (histogram,) = metrics.summary()["histograms"]
+    assert histogram["p50_seconds"] is None and histogram["p95_seconds"] is None
+    json.loads(json.dumps(metrics.summary(), allow_nan=False))
@@ -0,0 +1,55 @@
+import random
+from outdated_engine import OutdatedEngine, ProductIndex, parse_version
+
+DATASET = {
+    "products": {
+        "jQuery": {
+            "latest": "3.7.1",
+            "cycles": [{"cycle": "1", "eol": "2016-06-09"}, {"cycle": "3", "eol": None}],
+            "vulnerable": [
+                {"id": "CVE-2019-11358", "introduced": "1.1.4", "fixed": "3.4.0"},
+                {"id": "CVE-2020-11022", "introduced": "1.2", "fixed": "3.5.0"},
+            ],
+        }
+    }
+}
+
+
+def test_parse_version():
+    assert parse_version("3.5.1-rc1") == (3, 5, 1, 0)
+    assert parse_version("v10") == (10, 0, 0, 0)
+    assert parse_version("unknown") is None
+
+
+def test_classify():
+    engine = OutdatedEngine(DATASET, as_of=None)
+    assert engine.classify("jQuery", "3.4.1")["advisories"] == ["CVE-2020-11022"]
+    assert engine.classify("jquery", "3.6.0")["status"] == "outdated"
+    assert engine.classify("jQuery", "3.7.1")["status"] == "current"
+    assert engine.classify("jQuery", "1.0")["status"] == "eol"
+    assert engine.classify("jQuery", None)["status"] == "unknown"
+    assert engine.classify("Unknown Library", "1.0")["status"] == "unknown"
+
+
+def test_interval_index_matches_a_linear_scan():
+    rng = random.Random(7)
+
+    def version():
+        return ".".join(str(rng.randint(0, 4)) for _ in range(rng.randint(1, 3)))
+
+    for _ in range(50):
+        advisories = []
+        for number in range(rng.randint(1, 8)):
+            advisory = {"id": f"A{number}", "introduced": version()}
+            if rng.random() < 0.8:
+                advisory["fixed"] = version()
+            advisories.append(advisory)
+        index = ProductIndex({"vulnerable": advisories})
+        for _ in range(200):
+            parsed = parse_version(version())
+            expected = {
+                advisory["id"] for advisory in advisories
+                if parse_version(advisory["introduced"]) <= parsed
+                and ("fixed" not in advisory or parsed < parse_version(advisory["fixed"]))
+            }
+            assert set(index.advisories(parsed)) == expected
@@ -0,0 +1,69 @@
+import asyncio
+from page_lifecycle import PageRecycler
+
+
+class FakePage:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def crash(self):
+        self.handlers["crash"](self)
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+def recycler(**options):
+    opened = []
+
+    async def open_page():
+        opened.append(FakePage(len(opened)))
+        return opened[-1]
+
+    return PageRecycler(open_page, **options), opened
+
+
+def test_crashed_page_is_replaced_without_recycling_limits():
+    async def run():
+        pages, opened = recycler()
+        page = await pages.start()
+        assert await pages.after_domain() is page
+        page.crash()
+        replacement = await pages.after_domain()
+        assert replacement is not page and page.closed
+        assert await pages.after_domain() is replacement
+        return len(opened)
+
+    assert asyncio.run(run()) == 2
+
+
+def test_closed_page_is_replaced_by_the_spare():
+    async def run():
+        pages, opened = recycler(max_domains=100)
+        page = await pages.start()
+        await asyncio.sleep(0)  # Let the spare open
+        page.closed = True
+        replacement = await pages.after_domain()
+        assert replacement is opened[1]
+        await pages.close()
+
+    asyncio.run(run())
+
+
+def test_pages_are_recycled_after_max_domains():
+    async def run():
+        pages, opened = recycler(max_domains=2)
+        page = await pages.start()
+        assert await pages.after_domain() is page
+        assert await pages.after_domain() is not page
+        await pages.close()
+
+    asyncio.run(run())
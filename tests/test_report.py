@@ -0,0 +1,41 @@
+import io
+import json
+import pytest
+from report import build_report, iter_json_array, iter_jsonl_range, plan_tasks
+
+RECORDS = [
+    {"domain": f"site-{i}.com", "status": "success", "technologies": [{"name": "jQuery", "version": f"3.{i % 8}.0"}]}
+    for i in range(300)
+] + [{"domain": "down.com", "status": "error", "technologies": []}]
+
+
+def test_json_array_elements_split_across_reads():
+    text = " [\n" + ",\n".join(json.dumps(record) for record in RECORDS) + "\n] "
+    assert list(iter_json_array(io.StringIO(text), read_size=7)) == RECORDS
+    assert list(iter_json_array(io.StringIO("[]"))) == []
+
+
+def test_truncated_json_array_is_an_error():
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[{"domain": "a.com"}, {"dom'), read_size=5))
+
+
+def test_jsonl_ranges_cover_every_line_once(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text("".join(json.dumps(record) + "\n" for record in RECORDS))
+    tasks = plan_tasks([str(path)], split_bytes=997)
+    assert len(tasks) > 10
+    records = [record for _, start, end in tasks for record in iter_jsonl_range(str(path), start, end)]
+    assert records == RECORDS
+
+
+def test_split_and_whole_reports_agree(tmp_path):
+    lines = tmp_path / "results.jsonl"
+    lines.write_text("".join(json.dumps(record) + "\n" for record in RECORDS))
+    array = tmp_path / "results.json"
+    array.write_text(json.dumps(RECORDS))
+    split = build_report([str(lines)], workers=2, split_bytes=2048).summary()
+    whole = build_report([str(array)], workers=1).summary()
+    assert split == whole
+    assert split["records"] == len(RECORDS)
+    assert split["statuses"] == {"success": 300, "error": 1}
@@ -0,0 +1,51 @@
+from result_store import ResultStore, version_key
+
+
+def jquery(domain, version):
+    return {"domain": domain, "status": "success", "technologies": [{"name": "jQuery", "category": "JavaScript libraries", "version": version}]}
+
+
+def rescan(path, result):
+    with ResultStore(str(path)) as store:
+        store.write(result)
+
+
+def test_version_key_orders_like_versions():
+    assert version_key("3.10.0") > version_key("3.5.1")
+    assert version_key("unknown") is None
+
+
+def test_query_finds_old_versions(tmp_path):
+    path = tmp_path / "store.sqlite3"
+    with ResultStore(str(path)) as store:
+        store.write(jquery("a.com", "3.4.1"))
+        store.write(jquery("b.com", "3.7.1"))
+    with ResultStore(str(path)) as store:
+        assert store.domains_with("jquery", below="3.5") == [("a.com", "jQuery", "3.4.1")]
+
+
+def test_failed_rescan_keeps_previous_technologies(tmp_path):
+    path = tmp_path / "store.sqlite3"
+    rescan(path, jquery("a.com", "3.4.1"))
+    rescan(path, {"domain": "a.com", "status": "error", "technology_stack": ["Error: timeout"], "technologies": []})
+    rescan(path, {"domain": "a.com", "status": "no_suggestions", "technology_stack": ["No suggestions available"], "technologies": []})
+    with ResultStore(str(path)) as store:
+        assert store.domains_with("jquery", below="3.5") == [("a.com", "jQuery", "3.4.1")]
+        assert store.technologies_of("a.com") == [("jQuery", "JavaScript libraries", "3.4.1", None)]
+
+
+def test_empty_rescan_keeps_previous_technologies(tmp_path):
+    path = tmp_path / "store.sqlite3"
+    rescan(path, jquery("a.com", "3.4.1"))
+    rescan(path, {"domain": "a.com", "status": "success", "technology_stack": ["No data found."], "technologies": []})
+    with ResultStore(str(path)) as store:
+        assert store.domains_with("jquery") == [("a.com", "jQuery", "3.4.1")]
+
+
+def test_successful_rescan_replaces_technologies(tmp_path):
+    path = tmp_path / "store.sqlite3"
+    rescan(path, jquery("a.com", "3.4.1"))
+    rescan(path, jquery("a.com", "3.7.1"))
+    with ResultStore(str(path)) as store:
+        assert store.domains_with("jquery", below="3.5") == []
+        assert store.domains_with("jquery") == [("a.com", "jQuery", "3.7.1")]
@@ -0,0 +1,81 @@
+import asyncio
+from result_sink import ResultSink
+from sharded_runner import WorkQueue, leased_domains, shard_path
+
+DOMAINS = ["a.com", "b.com", "c.com", "d.com", "e.com"]
+
+
+def queue_of(tmp_path, domains=DOMAINS, **options):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite3"), **options)
+    queue.load(domains)
+    return queue
+
+
+def drain(queue, worker_id):
+    async def collect():
+        return [domain async for domain in leased_domains(queue, worker_id, 2, poll_seconds=0.01)]
+    return asyncio.run(collect())
+
+
+def test_workers_never_lease_the_same_domain(tmp_path):
+    queue = queue_of(tmp_path)
+    first = queue.lease(0, 3)
+    second = queue.lease(1, 3)
+    assert len(first) == 3 and len(second) == 2
+    assert set(first) | set(second) == set(DOMAINS)
+    queue.close()
+
+
+def test_restarted_worker_picks_up_its_previous_leases(tmp_path):
+    queue = queue_of(tmp_path)
+    crashed = queue.lease(0, 2)  # Worker 0 dies holding these
+    assert queue.release(0) == 2  # What its replacement does on start
+    done = []
+    for domain in drain(queue, 0):
+        done.append(domain)
+        queue.complete([domain])
+    assert set(crashed) <= set(done)
+    assert queue.counts() == {"done": len(DOMAINS)}
+    queue.close()
+
+
+def test_expired_lease_of_another_worker_is_reclaimed(tmp_path):
+    queue = queue_of(tmp_path, ["a.com"], lease_seconds=0.05)
+    assert queue.lease(1, 10) == ["a.com"]
+    assert drain(queue, 0) == ["a.com"]  # Polls until worker 1's lease runs out
+    queue.close()
+
+
+def test_domain_that_keeps_crashing_workers_is_dropped(tmp_path):
+    queue = queue_of(tmp_path, ["a.com"], max_attempts=2)
+    for _ in range(2):
+        assert queue.lease(0, 1) == ["a.com"]
+        queue.release(0)
+    assert queue.lease(0, 1) == []
+    queue.close()
+
+
+def test_concurrent_workers_drain_the_queue(tmp_path):
+    # Each worker completes domains only when its shard flushes (every 50 results), so
+    # both end with a buffered tail while the other still looks busy
+    path = str(tmp_path / "queue.sqlite3")
+    queue_of(tmp_path, [f"site-{i}.com" for i in range(130)]).close()
+
+    async def worker(worker_id):
+        queue = WorkQueue(path)
+        sink = ResultSink(shard_path(str(tmp_path), worker_id), on_flush=lambda results: queue.complete([result["domain"] for result in results]))
+        try:
+            async for domain in leased_domains(queue, worker_id, 20, poll_seconds=0.01, flush=sink.flush):
+                await asyncio.sleep(0.001)
+                sink.write({"domain": domain, "status": "success"})
+        finally:
+            sink.close()
+            queue.close()
+
+    async def run():
+        await asyncio.wait_for(asyncio.gather(worker(0), worker(1)), timeout=10)
+
+    asyncio.run(run())
+    queue = WorkQueue(path)
+    assert queue.counts() == {"done": 130}
+    queue.close()
@@ -0,0 +1,35 @@
+from result_sink import iter_results
+from snapshots import SnapshotRecorder
+
+
+def jquery(domain, version):
+    return {"domain": domain, "status": "success", "technologies": [{"name": "jQuery", "version": version}]}
+
+
+def record(tmp_path, result):
+    with SnapshotRecorder(str(tmp_path / "snapshots.sqlite3"), str(tmp_path / "changes.jsonl")) as recorder:
+        recorder.write(result)
+
+
+def changes(tmp_path):
+    return list(iter_results(str(tmp_path / "changes.jsonl")))
+
+
+def test_version_change_is_reported(tmp_path):
+    record(tmp_path, jquery("a.com", "3.4.1"))
+    record(tmp_path, jquery("a.com", "3.4.1"))
+    record(tmp_path, jquery("a.com", "3.7.1"))
+    first, second = changes(tmp_path)
+    assert first["new"] and first["added"] == [{"name": "jQuery", "version": "3.4.1"}]
+    assert second["version_changed"] == [{"name": "jQuery", "from": "3.4.1", "to": "3.7.1"}]
+    assert second["removed"] == []
+
+
+def test_failed_and_empty_lookups_keep_previous_snapshot(tmp_path):
+    record(tmp_path, jquery("a.com", "3.4.1"))
+    record(tmp_path, {"domain": "a.com", "status": "error", "technology_stack": ["Error: timeout"], "technologies": []})
+    record(tmp_path, {"domain": "a.com", "technology_stack": ["No suggestions available"]})
+    record(tmp_path, {"domain": "a.com", "status": "success", "technology_stack": ["No data found."], "technologies": []})
+    assert len(changes(tmp_path)) == 1
+    with SnapshotRecorder(str(tmp_path / "snapshots.sqlite3"), None) as recorder:
+        assert recorder.components_at("a.com") == {"jquery": ["jQuery", "3.4.1"]}
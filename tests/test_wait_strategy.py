@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from wait_strategy import WaitStrategy
+
+TIMEOUTS = {"suggestion": 400, "suggestion_render": 100}
+
+
+class Request:
+    post_data = None
+
+
+class Response:
+    def __init__(self, url, status):
+        self.url = url
+        self.status = status
+        self.ok = 200 <= status < 300
+        self.request = Request()
+
+
+class SearchPage:
+    # Just the calls WaitStrategy.search makes. `responses` are (seconds, url, status)
+    # in arrival order; `suggestion` is when the suggestion renders, or an exception
+    # for the suggestion wait to raise.
+    def __init__(self, responses=(), suggestion=None):
+        self.responses = responses
+        self.suggestion = suggestion
+
+    async def fill(self, selector, text):
+        pass
+
+    async def type(self, selector, text):
+        pass
+
+    async def wait_for_selector(self, selector, timeout):
+        if isinstance(self.suggestion, Exception):
+            await asyncio.sleep(0.01)
+            raise self.suggestion
+        if self.suggestion is None or self.suggestion * 1000 > timeout:
+            await asyncio.sleep(timeout / 1000)
+            raise PlaywrightTimeoutError(f"Timeout {timeout}ms exceeded.")
+        await asyncio.sleep(self.suggestion)
+
+    async def wait_for_event(self, event, predicate, timeout):
+        elapsed = 0
+        for at, url, status in self.responses:
+            await asyncio.sleep(at - elapsed)
+            elapsed = at
+            response = Response(url, status)
+            if predicate(response):
+                return response
+        await asyncio.sleep(max(0, timeout / 1000 - elapsed))
+        raise PlaywrightTimeoutError(f"Timeout {timeout}ms exceeded.")
+
+
+def search(page):
+    return asyncio.run(WaitStrategy(TIMEOUTS).search(page, "#input-80", "example.com"))
+
+
+def test_suggestion_found():
+    assert search(SearchPage(suggestion=0.05)) == 'text="example.com"'
+
+
+def test_partial_query_response_does_not_count():
+    # The fill() XHR answers first; the suggestion renders later than suggestion_render
+    # after it, but soon after the response to the whole domain
+    page = SearchPage([(0.01, "/api/suggest?q=example.co", 200), (0.2, "/api/suggest?q=example.com", 200)], suggestion=0.25)
+    assert search(page) == 'text="example.com"'
+
+
+def test_answer_without_the_domain_means_no_suggestion():
+    with pytest.raises(TimeoutError, match="No suggestion for example.com"):
+        search(SearchPage([(0.01, "/api/suggest?q=example.com", 200)]))
+
+
+def test_failed_suggestion_request_is_not_no_suggestion():
+    with pytest.raises(RuntimeError, match="HTTP 500"):
+        search(SearchPage([(0.01, "/api/suggest?q=example.com", 500)]))
+
+
+def test_unanswered_suggestion_request_is_not_no_suggestion():
+    # Nothing matched within the deadline: a slow or unrecognized suggestion XHR
+    with pytest.raises(RuntimeError, match="No suggestion response"):
+        search(SearchPage([(0.01, "/api/suggest?q=example.co", 200)]))
+
+
+def test_other_failures_are_not_no_suggestion():
+    with pytest.raises(PlaywrightError) as error:
+        search(SearchPage(suggestion=PlaywrightError("Target page, context or browser has been closed")))
+    assert not isinstance(error.value, TimeoutError)
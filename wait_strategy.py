@@ -0,0 +1,181 @@
+import asyncio
+import time
+import urllib.parse
+from contextlib import contextmanager
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# Deadlines in milliseconds, keyed by the phase they bound
+DEFAULT_TIMEOUTS = {
+    "search_box": 60000,
+    "suggestion": 10000,
+    "suggestion_render": 1500,
+    "results": 20000,
+    "lookup": 10000,
+    "settle": 5000,
+    "login_form": 120000,
+    "login": 15000,
+    "session_probe": 5000,
+    "navigation": 30000,
+}
+
+# Resolves once `root` has seen no DOM mutations for `quiet` ms, or after `timeout` ms
+SETTLE_SCRIPT = """
+([selector, quiet, timeout]) => new Promise((resolve) => {
+    const root = document.querySelector(selector) || document.body;
+    let timer = setTimeout(done, quiet);
+    const deadline = setTimeout(done, timeout);
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(done, quiet);
+    });
+    observer.observe(root, {childList: true, subtree: true, characterData: true, attributes: true});
+    function done() {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(deadline);
+        resolve(true);
+    }
+})
+"""
+
+
+class WaitStrategy:
+    # Waits on concrete page signals (suggestion XHR, result selectors, DOM quiet)
+    # instead of fixed sleeps. Every wait is bounded by a deadline from self.timeouts,
+    # or, with `deadlines` (see deadlines.AdaptiveDeadlines), by one learned from
+    # observed latencies with self.timeouts as the ceiling.
+    def __init__(self, timeouts=None, suggestion_url_pattern="suggest", settle_quiet_ms=300, deadlines=None):
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.suggestion_url_pattern = suggestion_url_pattern
+        self.settle_quiet_ms = settle_quiet_ms
+        self.deadlines = deadlines
+
+    def timeout(self, phase):
+        if self.deadlines:
+            return self.deadlines.timeout(phase, self.timeouts[phase])
+        return self.timeouts[phase]
+
+    @contextmanager
+    def measure(self, phase):
+        # Feed how long a wait took, timed out or not, back into the adaptive deadlines
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.deadlines:
+                self.deadlines.observe(phase, time.perf_counter() - start)
+
+    async def type_query(self, page, selector, text):
+        # Fill everything but the last character, then type it so key handlers still fire
+        await page.fill(selector, text[:-1])
+        await page.type(selector, text[-1:])
+
+    def is_suggestion_response(self, response, domain):
+        # The suggestion XHR for the whole domain; the partial query typed by fill()
+        # fires its own request, which must not count as the answer
+        if self.suggestion_url_pattern not in response.url:
+            return False
+        query = urllib.parse.unquote_plus(response.url) + " " + (response.request.post_data or "")
+        return domain in query
+
+    async def search(self, page, selector, domain):
+        # Type the domain and wait for its suggestion. Returns the suggestion selector,
+        # or raises TimeoutError once the suggestion XHR for the domain has answered
+        # without it. A failed or unanswered suggestion XHR raises RuntimeError instead:
+        # that is a transient failure to retry, not a domain without data.
+        suggestion_selector = f'text="{domain}"'
+        deadline = self.timeout("suggestion")
+        suggestion = asyncio.ensure_future(page.wait_for_selector(suggestion_selector, timeout=deadline))
+        response = asyncio.ensure_future(page.wait_for_event(
+            "response",
+            predicate=lambda r: self.is_suggestion_response(r, domain),
+            timeout=deadline,
+        ))
+        try:
+            await self.type_query(page, selector, " " + domain)
+            with self.measure("suggestion"):
+                done, _ = await asyncio.wait({suggestion, response}, return_when=asyncio.FIRST_COMPLETED)
+                if suggestion in done and not isinstance(suggestion.exception(), PlaywrightTimeoutError):
+                    await suggestion  # Found, or failed for a reason other than the deadline
+                    return suggestion_selector
+                try:
+                    answer = await response
+                except PlaywrightTimeoutError:
+                    raise RuntimeError(f"No suggestion response for {domain} within {deadline:.0f} ms")
+            if not answer.ok:
+                raise RuntimeError(f"Suggestion request for {domain} failed with HTTP {answer.status}")
+            try:
+                # The suggestions came back; give them a moment to render, not the full deadline
+                await asyncio.wait_for(suggestion, self.timeout("suggestion_render") / 1000)
+            except (asyncio.TimeoutError, PlaywrightTimeoutError):
+                # Playwright's timeout is not a TimeoutError; either way the answer lacked the domain
+                raise TimeoutError(f"No suggestion for {domain}")
+            return suggestion_selector
+        finally:
+            for task in (suggestion, response):
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # Mark the outcome as retrieved
+
+    async def wait_for_results(self, page, selector, root_selector="main", phase="results"):
+        with self.measure(phase):
+            await page.wait_for_selector(selector, timeout=self.timeout(phase))
+        await self.wait_for_settled(page, root_selector)
+
+    async def wait_for_settled(self, page, root_selector="main"):
+        await page.evaluate(SETTLE_SCRIPT, [root_selector, self.settle_quiet_ms, self.timeout("settle")])
+
+    async def wait_for_navigation(self, page):
+        with self.measure("navigation"):
+            await page.wait_for_load_state("domcontentloaded", timeout=self.timeout("navigation"))
+
+    async def wait_for_search_box(self, page, selector):
+        with self.measure("search_box"):
+            await page.wait_for_selector(selector, timeout=self.timeout("search_box"))
+
+    async def wait_for_login_form(self, page, selector):
+        with self.measure("login_form"):
+            await page.wait_for_selector(selector, timeout=self.timeout("login_form"))
+
+    async def wait_for_signed_in(self, page, selector):
+        # Not measured: a signed-out probe always runs to its deadline
+        await page.wait_for_selector(selector, state="attached", timeout=self.timeout("session_probe"))
+
+    async def wait_for_login(self, page, form_selector):
+        # Signed in once the login form is gone
+        with self.measure("login"):
+            await page.wait_for_selector(form_selector, state="detached", timeout=self.timeout("login"))
+
+
+class FixedDelayWaitStrategy(WaitStrategy):
+    # The original timing: slow typing, networkidle and fixed sleeps. Slower, but
+    # useful when the page stops emitting the signals WaitStrategy relies on.
+    def __init__(self, timeouts=None, typing_delay=350, settle_seconds=5):
+        super().__init__(timeouts)
+        self.typing_delay = typing_delay
+        self.settle_seconds = settle_seconds
+
+    async def type_query(self, page, selector, text):
+        await page.type(selector, text, delay=self.typing_delay)
+
+    async def search(self, page, selector, domain):
+        suggestion_selector = f'text="{domain}"'
+        await self.type_query(page, selector, " " + domain)
+        try:
+            with self.measure("suggestion"):
+                await page.wait_for_selector(suggestion_selector, timeout=self.timeout("suggestion"))
+        except Exception as e:
+            raise TimeoutError(f"No suggestion for {domain}: {e}")
+        return suggestion_selector
+
+    async def wait_for_settled(self, page, root_selector="main"):
+        await asyncio.sleep(self.settle_seconds)
+
+    async def wait_for_navigation(self, page):
+        await page.wait_for_load_state("networkidle")
+
+    async def wait_for_login(self, page, form_selector):
+        await asyncio.sleep(self.settle_seconds)
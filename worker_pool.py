@@ -0,0 +1,138 @@
+import asyncio
+import random
+import time
+from metrics import METRICS
+from page_lifecycle import PageRecycler
+
+
+class RateLimiter:
+    # Global requests-per-second ceiling shared by every worker in the pool.
+    # Each acquire reserves the next free slot, so bursts are spread out evenly.
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class TransientError(Exception):
+    # Raised by process_item for failures worth another attempt (timeouts, dropped
+    # connections). `result` is what to record if every attempt fails.
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+class RetryPolicy:
+    # Exponential backoff with full jitter: retry n waits uniform(0, min(max_delay, base_delay * 2**n))
+    def __init__(self, max_attempts=3, base_delay=5.0, max_delay=120.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+async def run_worker_pool(items, open_page, process_item, concurrency=4, requests_per_second=1.0,
+                          max_items_per_page=None, max_heap_mb=None, retry=None, on_give_up=None, limiter=None):
+    # Feed items through a bounded queue to `concurrency` workers, each owning one page
+    # from open_page(). items may be a plain or an async iterable. process_item(page, item)
+    # is rate limited across all workers, or by `limiter` when one is shared wider.
+    # Pages are recycled after max_items_per_page items, past max_heap_mb of JS heap, or
+    # as soon as one has crashed or closed.
+    # An item whose process_item raises TransientError goes back on the queue after a
+    # backoff delay from `retry`; once its attempts run out on_give_up(item, error) is called.
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    limiter = limiter or RateLimiter(requests_per_second)
+    retry = retry or RetryPolicy()
+    failed_workers = []
+    attempts = {}
+    retries = set()
+
+    async def requeue(item, delay):
+        await asyncio.sleep(delay)
+        await queue.put(item)
+
+    def schedule_retry(item, error):
+        attempt = attempts.get(item, 1)
+        if attempt >= retry.max_attempts:
+            attempts.pop(item, None)
+            print(f"Giving up on {item} after {attempt} attempts: {error}")
+            if on_give_up:
+                on_give_up(item, error)
+            return
+        attempts[item] = attempt + 1
+        delay = retry.delay(attempt)
+        print(f"Retrying {item} in {delay:.1f}s (attempt {attempt + 1} of {retry.max_attempts}): {error}")
+        METRICS.increment("retries")
+        task = asyncio.create_task(requeue(item, delay))
+        retries.add(task)
+        task.add_done_callback(retries.discard)
+
+    async def produce():
+        if hasattr(items, "__aiter__"):
+            async for item in items:
+                await queue.put(item)
+        else:
+            for item in items:
+                await queue.put(item)
+        # Stop only once every item, retries included, has been processed. A retry is
+        # scheduled before its failed attempt is marked done, so join() cannot miss it.
+        await queue.join()
+        while retries:
+            await asyncio.gather(*retries)
+            await queue.join()
+        for _ in range(concurrency):
+            await queue.put(None)  # One stop marker per worker
+
+    async def work(worker_id):
+        pages = PageRecycler(open_page, max_items_per_page, max_heap_mb)
+        try:
+            page = await pages.start()
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                try:
+                    await limiter.acquire()
+                    try:
+                        await process_item(page, item)
+                        attempts.pop(item, None)
+                    except TransientError as e:
+                        schedule_retry(item, e)
+                    except Exception as e:
+                        print(f"Worker {worker_id} failed on {item}: {e}")
+                    page = await pages.after_domain()
+                finally:
+                    queue.task_done()
+        except Exception as e:
+            print(f"Worker {worker_id} stopped: {e}")
+            failed_workers.append(worker_id)
+        finally:
+            try:
+                await pages.close()
+            except Exception as e:
+                print(f"Worker {worker_id} failed to close its pages: {e}")
+
+    producer = asyncio.create_task(produce())
+    await asyncio.gather(*(work(worker_id) for worker_id in range(concurrency)))
+    if len(failed_workers) == concurrency:
+        # Every worker died before the list was exhausted
+        print("All workers stopped, abandoning the remaining items")
+        producer.cancel()
+        for task in list(retries):
+            task.cancel()
+    try:
+        await producer
+    except asyncio.CancelledError:
+        pass